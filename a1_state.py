@@ -46,6 +46,16 @@ class State:
             # Create a new yield
             yield State(new_grid)
 
+    def movesWithPositions(self):
+        """
+            Like moves(), but yields ((i, j), state) pairs so callers also know
+            which cell the counter was removed from.
+        """
+        for (i,j) in self.getPositions():
+            new_grid = [row[:] for row in self.grid]
+            new_grid[i][j] -= 1
+            yield (i, j), State(new_grid)
+
     def numRegions(self):
         """
         Calculates and returns the number of connected regions of active nodes.
@@ -11,22 +11,795 @@ Includes a Agent class for Task 3
 """
 
 from a1_state import State
+from a5_endgame import Tablebase, parity_result, solve
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import cProfile
+import json
+import math
+import os
+import pstats
+import struct
+import threading
 import time
 import random
+import tracemalloc
+import weakref
+
+try:
+    import numpy as np
+except ImportError:  # batched playouts fall back to the per-State loop
+    np = None
+
+# Bound types stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Width of the null windows used by PVS and MTD(f); evaluations differ by at least 1e-4
+NULL_WINDOW = 1e-6
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 1.0
+# Value of a position whose player to move can split a region (selective search)
+WIN_SCORE = 1000.0
+
+class TranspositionTable:
+    """
+    Bounded transposition table shared by minimax and alpha-beta.
+
+    Hinger positions are reached through many move orders (removing a then b
+    or b then a gives the same board), so search results are cached by position.
+    Each slot holds two entries: one kept by depth, only replaced by a deeper
+    search or once it is left over from an earlier move, and one that is
+    always replaced.
+    Entries are (key, depth, value, flag, best_move, age) tuples.
+    """
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.deep = [None] * size
+        self.recent = [None] * size
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    @staticmethod
+    def key(state, is_maximizing):
+        """Position key; the side to move is part of it since values are not symmetric."""
+        return (tuple(tuple(row) for row in state.grid), is_maximizing)
+
+    def new_search(self):
+        """Start a new search; entries from earlier searches become replaceable."""
+        self.age += 1
+
+    def clear(self):
+        """Drop every entry, e.g. at the start of a new game."""
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+        self.age = 0
+
+    def probe(self, key):
+        """Return the stored entry for key, or None."""
+        self.probes += 1
+        slot = hash(key) % self.size
+        for entry in (self.deep[slot], self.recent[slot]):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        """Store a search result, replacing by depth and age."""
+        slot = hash(key) % self.size
+        entry = (key, depth, value, flag, best_move, self.age)
+        deep = self.deep[slot]
+
+        if deep is not None and deep[0] == key:
+            # Same position: keep whichever result came from the deeper search
+            if depth >= deep[1]:
+                self.deep[slot] = entry
+        elif deep is None or depth >= deep[1] or deep[5] != self.age:
+            self.deep[slot] = entry
+            recent = self.recent[slot]
+            if recent is not None and recent[0] == key:
+                self.recent[slot] = None
+        else:
+            self.recent[slot] = entry
+
+# Zobrist hashing: a fixed 64-bit key per (cell, count), XORed together.
+# The keys are derived from the cell and count alone, so every process
+# hashes a position to the same value.
+_MASK64 = (1 << 64) - 1
+
+def _mix64(x):
+    # splitmix64 finaliser
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+_ZOBRIST = [[_mix64(cell * 256 + count) for count in range(32)] for cell in range(64)]
+_ZOBRIST_MAX = _mix64(1 << 40)
+
+def zobrist_hash(state, is_maximizing):
+    """64-bit hash of a position and the side to move."""
+    h = _ZOBRIST_MAX if is_maximizing else 0
+    cell = 0
+    for row in state.grid:
+        for count in row:
+            if count:
+                h ^= _ZOBRIST[cell][count] if cell < 64 and count < 32 else _mix64(cell * 256 + count)
+            cell += 1
+    return h
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory, used by the parallel alpha-beta workers.
+
+    It is lock-free: each slot holds three 64-bit words (key ^ value ^ meta,
+    value, meta). A slot torn by two processes writing at once fails the key
+    check on probe and simply counts as a miss. The header holds the stop
+    flag and the search age shared by all workers. Keys are Zobrist hashes,
+    and the probe/store interface matches TranspositionTable.
+    """
+    HEADER_WORDS = 2
+
+    def __init__(self, size=1 << 18):
+        # Attaching processes must share the creator's resource tracker
+        resource_tracker.ensure_running()
+        self.size = size
+        self.shm = shared_memory.SharedMemory(create=True, size=8 * (self.HEADER_WORDS + 3 * size))
+        self.words = self.shm.buf.cast("Q")
+        self.probes = 0
+        self.hits = 0
+        # Only the creating process frees the block
+        self._finalizer = weakref.finalize(self, SharedTranspositionTable._release, self.shm, self.words, True)
+
+    def __getstate__(self):
+        return (self.shm.name, self.size)
+
+    def __setstate__(self, data):
+        name, self.size = data
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.words = self.shm.buf.cast("Q")
+        self.probes = 0
+        self.hits = 0
+        self._finalizer = weakref.finalize(self, SharedTranspositionTable._release, self.shm, self.words, False)
+
+    @staticmethod
+    def _release(shm, words, unlink):
+        words.release()
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+    def close(self):
+        """Detach from the block (and free it in the creating process)."""
+        self._finalizer()
+
+    key = staticmethod(zobrist_hash)
+
+    def new_search(self):
+        self.words[1] = (self.words[1] + 1) & 0xFFFF
+
+    def clear(self):
+        self.shm.buf[8 * self.HEADER_WORDS:] = bytes(len(self.shm.buf) - 8 * self.HEADER_WORDS)
+
+    def request_stop(self):
+        """Tell every worker searching with this table to abort."""
+        self.words[0] = 1
+
+    def clear_stop(self):
+        self.words[0] = 0
+
+    def stop_requested(self):
+        return self.words[0] != 0
+
+    def probe(self, key):
+        self.probes += 1
+        base = self.HEADER_WORDS + 3 * (key % self.size)
+        check, value_bits, meta = self.words[base], self.words[base + 1], self.words[base + 2]
+        if not meta & 1 or check ^ value_bits ^ meta != key:
+            return None
+        self.hits += 1
+
+        # meta: bit 0 valid, bits 1-2 flag, 3-10 depth, 11-18 move, 19-34 age
+        value = struct.unpack("<d", struct.pack("<Q", value_bits))[0]
+        code = (meta >> 11) & 0xFF
+        best_move = divmod(code - 1, 16) if code else None
+        return (key, (meta >> 3) & 0xFF, value, (meta >> 1) & 3, best_move, (meta >> 19) & 0xFFFF)
+
+    def store(self, key, depth, value, flag, best_move):
+        base = self.HEADER_WORDS + 3 * (key % self.size)
+        age = self.words[1]
+
+        # Keep a deeper entry for another position written during this search
+        old_check, old_value, old_meta = self.words[base], self.words[base + 1], self.words[base + 2]
+        if (old_meta & 1 and old_check ^ old_value ^ old_meta != key
+                and (old_meta >> 3) & 0xFF > depth and (old_meta >> 19) & 0xFFFF == age):
+            return
+
+        # Moves are packed as row * 16 + col + 1, which covers boards up to 15x16
+        code = 0
+        if best_move is not None and best_move[0] < 15 and best_move[1] < 16:
+            code = best_move[0] * 16 + best_move[1] + 1
+        meta = 1 | (flag << 1) | (min(depth, 255) << 3) | (code << 11) | (age << 19)
+        value_bits = struct.unpack("<Q", struct.pack("<d", value))[0]
+
+        self.words[base + 1] = value_bits
+        self.words[base + 2] = meta
+        self.words[base] = key ^ value_bits ^ meta
+
+class SearchTimeout(Exception):
+    """Raised inside a search once its deadline has passed."""
+
+class GameClock:
+    """
+    A per-game time budget split across the agent's moves.
+    Each move gets the remaining time divided by the number of moves the
+    agent still expects to make.
+    """
+    def __init__(self, total_time, moves_horizon=10, min_move_time=0.05, reserve=0.05):
+        """
+        :param total_time: Seconds available for the whole game.
+        :param moves_horizon: Most moves the agent plans for; games rarely last until the board is empty.
+        :param min_move_time: Smallest budget handed to a single move.
+        :param reserve: Fraction of the remaining time held back as a safety margin.
+        """
+        self.remaining = total_time
+        self.moves_horizon = moves_horizon
+        self.min_move_time = min_move_time
+        self.reserve = reserve
+
+    def allot(self, state):
+        """Return the time budget for a move from state."""
+        counters = sum(sum(row) for row in state.grid)
+        # Each player makes about half of the moves left on the board
+        moves_left = max(1, min(self.moves_horizon, (counters + 1) // 2))
+        return max(self.min_move_time, self.remaining * (1 - self.reserve) / moves_left)
+
+    def consume(self, elapsed):
+        """Charge the time a move took to the clock."""
+        self.remaining = max(0.0, self.remaining - elapsed)
+
+DEFAULT_TELEMETRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry.jsonl")
+
+class Telemetry:
+    """
+    Per-move search statistics, written as one JSON object per line.
+    One instance can be shared by several agents; each record names its agent.
+    """
+    # Functions whose time is reported when profiling, by the name they are reported under
+    PROFILED = {"evaluate": "evaluate", "numRegions": "numRegions",
+                "moves": "move_generation", "movesWithPositions": "move_generation"}
+
+    def __init__(self, path=DEFAULT_TELEMETRY_PATH, stream=None, profile=False, trace_memory=False):
+        """
+        :param path: File the records are appended to (ignored when stream is given).
+        :param stream: Open text stream to write the records to instead.
+        :param profile: Run each move under cProfile and report the time spent in
+            evaluate, numRegions and move generation.
+        :param trace_memory: Report each move's peak allocation with tracemalloc (slow).
+        """
+        self.stream = stream if stream is not None else open(path, "a")
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profiler = None
+        self.start = None
+
+    def close(self):
+        self.stream.close()
+
+    def begin(self, agent):
+        """Start measuring a move of agent."""
+        self.tt_counts = (agent.tt.probes, agent.tt.hits) if agent.tt is not None else (0, 0)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.time()
+
+    def end(self, agent, state, mode):
+        """Finish measuring the move agent made from state and write its record."""
+        elapsed = time.time() - self.start
+        record = {
+            "agent": agent.name,
+            "mode": mode,
+            "board": state.grid,
+            "counters": sum(sum(row) for row in state.grid),
+            "elapsed": elapsed,
+            "nodes": agent.nodes,
+            "nodes_per_second": agent.nodes / elapsed if elapsed > 0 else None,
+            "depth": agent.depth_reached,
+            "tt_probes": 0,
+            "tt_hits": 0,
+            "cutoffs_by_move": {str(index): count for index, count in sorted(agent.cutoffs.items())},
+            "playouts": agent.playouts,
+        }
+        if agent.tt is not None:
+            record["tt_probes"] = agent.tt.probes - self.tt_counts[0]
+            record["tt_hits"] = agent.tt.hits - self.tt_counts[1]
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            times = {name: 0.0 for name in self.PROFILED.values()}
+            for (_, _, function), (_, _, _, cumulative, _) in pstats.Stats(self.profiler).stats.items():
+                if function in self.PROFILED:
+                    times[self.PROFILED[function]] += cumulative
+            record["profile"] = times
+            self.profiler = None
+        if self.trace_memory:
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - self.memory
+
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+class MCTSNode:
+    """
+    Node of the UCT search tree.
+    visits/wins are counted for the player who made the move into this node,
+    with a win scoring 1, a draw 0.5 and a loss 0.
+    """
+    def __init__(self, state, parent=None, move=None):
+        self.state = state
+        self.parent = parent
+        self.move = move  # cell the counter was removed from to reach this node
+        self.children = []
+        self.untried = list(state.movesWithPositions())
+        random.shuffle(self.untried)
+        self.visits = 0
+        self.wins = 0.0
+        self.regions = state.numRegions()
+
+        # Game over: the move into this node created a region (its mover wins),
+        # or no counters are left or no region can split any more (draw).
+        # A settled root is still expanded, since a move has to be played from it
+        if parent is not None and self.regions > parent.regions:
+            self.result = 1.0
+        elif not self.untried or (parent is not None and parity_result(state) is not None):
+            self.result = 0.5
+        else:
+            self.result = None
+
+    def uct_child(self, exploration):
+        """Child maximising the UCB1 score."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+# Process pools shared by the parallel search modes, one per worker count
+_process_pools = {}
+
+def _seed_worker():
+    # Forked workers inherit the parent's random state; give each its own
+    random.seed()
+
+def process_pool(workers=None):
+    """
+    Return a process pool with the given number of workers, created on first use.
+    """
+    workers = workers or os.cpu_count() or 1
+    pool = _process_pools.get(workers)
+    if pool is None:
+        # Workers must share this process's resource tracker to attach shared memory safely
+        resource_tracker.ensure_running()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_seed_worker)
+        _process_pools[workers] = pool
+    return pool
+
+def _root_mcts_worker(grid, iterations, time_limit, exploration):
+    # Grow an independent tree from the root and report its root statistics
+    state = State(grid)
+    agent = Agent(state=state, tt_size=0)
+    root = MCTSNode(state)
+    deadline = None if time_limit is None else time.time() + time_limit
+    agent.mcts_search(root, iterations, deadline, exploration)
+    return [(child.move, child.visits, child.wins) for child in root.children]
+
+def _lazy_smp_worker(grid, table, settings, helper, search_depth, time_limit):
+    # Helper search for Lazy SMP. It only fills the shared table; its own result is discarded.
+    # It is configured like the main search, so the values it stores mean the same
+    state = State(grid)
+    agent = Agent(state=state, tt_size=0)
+    for name, value in settings.items():
+        setattr(agent, name, value)
+    agent.tt = table
+    agent.should_stop = table.stop_requested
+
+    # Odd helpers start one ply deeper and every helper orders the root differently,
+    # so the workers spread over the tree instead of repeating the same search.
+    # Without a time limit they stop a ply past the main search; with one they
+    # keep deepening until the main search finishes or the clock runs out
+    max_depth = search_depth + 1 if time_limit is None else None
+    agent.iterative_deepening(state, "alpha_beta", time_limit, max_depth=max_depth,
+                              start_depth=helper % 2, shuffle_seed=helper)
+    table.close()
+
+# Agent settings copied into a worker process by move_async, move_many and lazy_smp
+_AGENT_SETTINGS = ("noise_seed", "time_limit", "playout", "collapse_moves", "move_ordering", "selective",
+                   "lmr_reduction", "lmr_min_depth", "lmr_full_moves", "extension", "max_extensions",
+                   "mcts_iterations", "pns_nodes")
+
+def _move_worker(grid, mode, settings, options):
+    # Play one move with a fresh agent configured like the caller's
+    state = State(grid)
+    agent = Agent(state=state)
+    for name, value in settings.items():
+        setattr(agent, name, value)
+    return agent.move(state, mode, **options).grid
+
+# Mirror images of a rectangular board as (flip rows, flip columns); each is its own inverse
+_SYMMETRIES = ((False, False), (True, False), (False, True), (True, True))
+
+def mirror_board(grid, flip_rows, flip_cols):
+    """Return grid as a tuple of rows, flipped top to bottom and/or left to right."""
+    rows = grid[::-1] if flip_rows else grid
+    return tuple(tuple(row[::-1]) if flip_cols else tuple(row) for row in rows)
+
+def canonical_board(grid):
+    """
+    Return (board, symmetry): the smallest of grid's mirror images as a tuple of rows and
+    the flips that produce it. Mirrored boards play alike, so they need only one search;
+    applying the same flips to the answer maps it back.
+    """
+    return min((mirror_board(grid, *symmetry), symmetry) for symmetry in _SYMMETRIES)
+
+def _move_many_worker(grids, mode, settings, options, table, deadline, min_move_time):
+    # Answer a share of a batch with one agent, so the positions share its tables
+    agent = Agent(state=State(list(map(list, grids[0]))), tt_size=0 if table is not None else 1 << 16)
+    for name, value in settings.items():
+        setattr(agent, name, value)
+    if table is not None:
+        agent.tt = table
+    try:
+        return agent.answer_batch(grids, mode, deadline, options, min_move_time)
+    finally:
+        if table is not None:
+            table.close()
+
+def _playout_worker(grids):
+    # Play out a batch of leaf positions
+    agent = Agent(state=State(grids[0]), tt_size=0)
+    return [agent.playout_result(State(grid)) for grid in grids]
+
+def _batch_regions(boards):
+    # Count the 8-connected regions of every board in a (n, rows, cols) array.
+    # Each active cell starts with its own label and repeatedly takes the largest
+    # label among its neighbours, so a region ends up labelled by its largest cell.
+    n, rows, cols = boards.shape
+    active = boards > 0
+    ids = np.arange(1, rows * cols + 1, dtype=np.int32).reshape(1, rows, cols)
+    labels = np.where(active, ids, 0)
+    while True:
+        padded = np.pad(labels, ((0, 0), (1, 1), (1, 1)))
+        spread = labels.copy()
+        for dr in range(3):
+            for dc in range(3):
+                np.maximum(spread, padded[:, dr:dr + rows, dc:dc + cols], out=spread)
+        spread *= active
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return ((labels == ids) & active).sum(axis=(1, 2))
+
+def batch_playout_scores(grids, simulations, max_depth=10, rng=None):
+    """
+    Run simulations random playouts from every grid at once with NumPy and return
+    the mean playout score of each grid. Scores match simulate_random_playout
+    without the evaluation tie-break noise.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    rows, cols = len(grids[0]), len(grids[0][0])
+    starts = np.asarray(grids, dtype=np.int16).reshape(len(grids), rows, cols)
+
+    # One row per playout: simulations copies of each start grid
+    boards = np.repeat(starts, simulations, axis=0).reshape(-1, rows * cols)
+    initial = np.repeat(_batch_regions(starts), simulations)
+    regions = initial.copy()
+    playing = np.ones(len(boards), dtype=bool)
+
+    for _ in range(max_depth):
+        index = np.flatnonzero(playing)
+        if not index.size:
+            break
+        active = boards[index] > 0
+
+        # Boards without counters have finished
+        has_moves = active.any(axis=1)
+        playing[index[~has_moves]] = False
+        index, active = index[has_moves], active[has_moves]
+        if not index.size:
+            break
+
+        # Uniform choice among active cells: the largest random key wins
+        keys = rng.random(active.shape)
+        keys[~active] = -1.0
+        cells = keys.argmax(axis=1)
+        boards[index, cells] -= 1
+
+        # Only emptying a cell can change the regions
+        emptied = boards[index, cells] == 0
+        if emptied.any():
+            changed = index[emptied]
+            # A move wins by splitting a region of the position just before it
+            new_regions = _batch_regions(boards[changed].reshape(-1, rows, cols))
+            playing[changed[new_regions > regions[changed]]] = False
+            regions[changed] = new_regions
+
+    scores = 15 * (regions - initial) - 0.5 * (boards > 0).sum(axis=1)
+    return scores.reshape(len(grids), simulations).mean(axis=1).tolist()
+
+# Ring of neighbours around a cell, in clockwise order
+_RING = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+def _ring_components(mask):
+    # Connected groups among the ring cells whose bits are set in mask
+    cells = [_RING[bit] for bit in range(8) if mask >> bit & 1]
+    groups = 0
+    seen = set()
+    for start in cells:
+        if start in seen:
+            continue
+        groups += 1
+        seen.add(start)
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            for other in cells:
+                if other not in seen and abs(other[0] - r) <= 1 and abs(other[1] - c) <= 1:
+                    seen.add(other)
+                    stack.append(other)
+    return groups
+
+# Groups of active ring cells for every mask of active neighbours
+_RING_GROUPS = [_ring_components(mask) for mask in range(256)]
+
+def ring_groups(grid, i, j):
+    """Number of separate groups among the active neighbours of cell (i, j)."""
+    rows, cols = len(grid), len(grid[0])
+    mask = 0
+    for bit, (di, dj) in enumerate(_RING):
+        r, c = i + di, j + dj
+        if 0 <= r < rows and 0 <= c < cols and grid[r][c]:
+            mask |= 1 << bit
+    return _RING_GROUPS[mask]
+
+def winning_cells(state):
+    """
+    Return the cells whose last counter splits a region: immediate wins for the
+    player to move. Cells whose neighbours form a single group are ruled out
+    without counting regions.
+    """
+    grid = state.grid
+    regions = None
+    cells = []
+    for (i, j) in state.getPositions(1):
+        if ring_groups(grid, i, j) < 2:
+            continue
+        if regions is None:
+            regions = state.numRegions()
+        grid[i][j] = 0
+        splits = state.numRegions() > regions
+        grid[i][j] = 1
+        if splits:
+            cells.append((i, j))
+    return cells
+
+class PlayoutKernel:
+    """
+    Scalar random playouts on a flat bytearray copy of one board.
+    Moves are played in place and undone afterwards, so the kernel can run many
+    playouts from the same position without creating States or grid copies.
+    """
+    # Neighbour tables, built once per board size
+    _tables = {}
+
+    def __init__(self, grid):
+        rows, cols = len(grid), len(grid[0])
+        self.board = bytearray(value for row in grid for value in row)
+        tables = PlayoutKernel._tables.get((rows, cols))
+        if tables is None:
+            ring = []
+            for r in range(rows):
+                for c in range(cols):
+                    ring.append(tuple((r + dr) * cols + c + dc
+                                      if 0 <= r + dr < rows and 0 <= c + dc < cols else -1
+                                      for dr, dc in _RING))
+            neighbours = [tuple(n for n in cells if n >= 0) for cells in ring]
+            tables = PlayoutKernel._tables[(rows, cols)] = (ring, neighbours)
+        self.ring, self.neighbours = tables
+
+        # Active cells, with each cell's index in the list for O(1) removal
+        self.active = [cell for cell, value in enumerate(self.board) if value]
+        self.where = [0] * len(self.board)
+        for index, cell in enumerate(self.active):
+            self.where[cell] = index
+
+        self.played = []
+        self.stack = []
+        # Flood fill marks; bumping the stamp clears them
+        self.seen = [0] * len(self.board)
+        self.stamp = 0
+
+    def region_change(self, cell):
+        """
+        Return how the region count changed when cell was just emptied.
+        """
+        board = self.board
+        mask = 0
+        for bit, n in enumerate(self.ring[cell]):
+            if n >= 0 and board[n]:
+                mask |= 1 << bit
+        groups = _RING_GROUPS[mask]
+
+        # No neighbours: a region vanished. One group: the region stays connected
+        if groups <= 1:
+            return groups - 1
+
+        # The groups may still join up further away; flood fill to find out
+        self.stamp += 1
+        stamp, seen, stack, neighbours = self.stamp, self.seen, self.stack, self.neighbours
+        components = 0
+        for n in self.ring[cell]:
+            if n < 0 or not board[n] or seen[n] == stamp:
+                continue
+            components += 1
+            seen[n] = stamp
+            stack.append(n)
+            while stack:
+                x = stack.pop()
+                for y in neighbours[x]:
+                    if board[y] and seen[y] != stamp:
+                        seen[y] = stamp
+                        stack.append(y)
+        return components - 1
+
+    def playout(self, max_depth=None):
+        """
+        Play random moves until one creates a new region, the board is empty or
+        max_depth moves were played, then undo them.
+        Returns (moves played, region change, active cells left, won).
+        """
+        board, active, where, played = self.board, self.active, self.where, self.played
+        rand = random.random
+        limit = -1 if max_depth is None else max_depth
+        regions = 0
+        won = False
+        while active and len(played) != limit:
+            index = int(rand() * len(active))
+            cell = active[index]
+            board[cell] -= 1
+            played.append(cell)
+
+            # Only emptying a cell can change the regions
+            if not board[cell]:
+                last = active.pop()
+                if last != cell:
+                    active[index] = last
+                    where[last] = index
+                # The rules compare with the position just before this move, not the start
+                change = self.region_change(cell)
+                regions += change
+                if change > 0:
+                    won = True
+                    break
+
+        moves, left = len(played), len(active)
+
+        # Roll the board back to the start position
+        while played:
+            cell = played.pop()
+            if not board[cell]:
+                where[cell] = len(active)
+                active.append(cell)
+            board[cell] += 1
+        return moves, regions, left, won
+
+    def score(self, max_depth=10):
+        """
+        Play out randomly and score the final board as simulate_random_playout does,
+        without the evaluation tie-break noise.
+        """
+        _, regions, left, _ = self.playout(max_depth)
+        return 15 * regions - 0.5 * left
+
 # Agent = Architecture + Program
 
 class Agent:
-    def __init__(self, state=None, modes=None, name=None):
+    def __init__(self, state=None, modes=None, name=None, tt_size=1 << 16, time_limit=None, clock=None,
+                 workers=None, playout="state", collapse_moves=False, move_ordering="evaluate",
+                 tablebase=None, selective=False, telemetry=None):
         """
         Initialize the Agent.
         :param state: A State object representing the initial game state.
         :param modes: List of game-playing strategies (optional).
         :param name: Agent's name (optional, defaults to 'B7').
+        :param tt_size: Transposition table slots for minimax/alpha-beta (0 disables it).
+        :param time_limit: Default seconds per move (None searches to a fixed depth).
+        :param clock: Default GameClock to split a per-game budget across moves.
+        :param workers: Processes used by the parallel modes (defaults to the CPU count).
+        :param playout: Playout engine: "state", "kernel" (flat-board scalar playouts) or
+            "batch" (NumPy, for monte_carlo and hybrid).
+        :param collapse_moves: Search one representative of each class of equivalent moves
+            in minimax and alpha-beta.
+        :param move_ordering: "evaluate" sorts children by their evaluation; "history" uses the
+            TT move, killer moves and a history table instead (alpha-beta and hybrid).
+        :param tablebase: Endgame Tablebase (or the path of one) probed before searching.
+        :param selective: Use late-move reductions, forcing-move extensions and immediate-win
+            checks in alpha-beta and hybrid.
+        :param telemetry: Telemetry that records the statistics of every move.
         """
         self.name = name if name else "B7"
         self.state = state if state else State(None)  # Use provided state or create a default one
         self.modes = modes if modes is not None else []
 
+        # The table persists across move() calls so later moves reuse earlier work
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+
+        # Seed for the evaluation tie-break noise, fixed for the agent's lifetime
+        self.noise_seed = random.getrandbits(32)
+
+        # Time control
+        self.time_limit = time_limit
+        self.clock = clock
+        self.deadline = None
+        # Optional callable polled during search; returning True aborts it
+        self.should_stop = None
+
+        # UCT search tree, kept between moves; iterations per move without a time limit
+        self.mcts_root = None
+        self.mcts_iterations = 1000
+
+        self.workers = workers
+        # Shared-memory table for the parallel alpha-beta mode, created on first use
+        self.shared_tt = None
+
+        # "batch" needs NumPy and falls back to the per-State loop without it
+        self.playout = playout
+        self.collapse_moves = collapse_moves
+
+        # Killer moves per remaining depth (for the current move) and cutoff counts per cell
+        self.move_ordering = move_ordering
+        self.killers = {}
+        self.history = {}
+
+        # Positions the tablebase covers are looked up instead of searched
+        self.tablebase = Tablebase(tablebase) if isinstance(tablebase, str) else tablebase
+
+        # Proof-number search: node budget per move and positions it has solved
+        self.pns_nodes = 100000
+        self.pn_table = {}
+
+        # Selective search: quiet moves after the first lmr_full_moves are searched
+        # lmr_reduction plies shallower from lmr_min_depth on; forcing moves are searched
+        # extension plies deeper, at most max_extensions times along a line
+        self.selective = selective
+        self.lmr_reduction = 1
+        self.lmr_min_depth = 2
+        self.lmr_full_moves = 3
+        self.extension = 1
+        self.max_extensions = 1
+
+        # Search counters for the current move, reported through telemetry
+        self.telemetry = telemetry
+        self.nodes = 0
+        self.playouts = 0
+        self.cutoffs = {}
+        self.depth_reached = None
+
+        # Pondering: background search on the opponent's time and the replies it found,
+        # each with the UCT tree kept after it (mcts modes)
+        self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.ponder_cache = {}
+
+        # Single background thread for move_async, created on first use
+        self.move_executor = None
+
+        # Region counts by board, kept while move_many answers a batch
+        self.eval_cache = None
+
     def __str__(self):
         """
         Return a string representation of the Agent, including its name and available modes.
@@ -34,76 +807,623 @@ class Agent:
         modes_str = ', '.join(self.modes) if self.modes else 'No modes available'
         return f"Agent Name: {self.name}\nBoard Size: {len(self.state.grid)}x{len(self.state.grid[0])}\nAvailable Modes: {modes_str}"
 
-    def move(self, state, mode, search_depth=3):
+    def new_game(self):
+        """
+        Forget search results from a previous game.
+        """
+        if self.tt is not None:
+            self.tt.clear()
+        self.noise_seed = random.getrandbits(32)
+        self.mcts_root = None
+        if self.shared_tt is not None:
+            self.shared_tt.clear()
+        self.killers.clear()
+        self.history.clear()
+        self.pn_table.clear()
+        self.stop_pondering()
+        self.ponder_cache.clear()
+
+    def move(self, state, mode, search_depth=3, time_limit=None, clock=None, max_depth=None):
         """
             Have agent create 2 seperate active regions
             Methods used: Minimax and Alpha-Beta Pruning
+
+            :param time_limit: Seconds for this move. Minimax, alpha-beta and hybrid then
+                deepen iteratively and play the best move of the deepest finished iteration.
+            :param clock: GameClock whose remaining time is split across the agent's moves.
+            :param max_depth: Deepest iteration under time control (defaults to the counters left).
         """
+        # The opponent has moved: stop pondering and keep what it found
+        pondering = self.ponder_thread is not None and threading.current_thread() is self.ponder_thread
+        if self.ponder_thread is not None and not pondering:
+            self.stop_pondering()
+
+        start_time = time.time()
+        # Search counters cover this move only, whether or not telemetry records them
+        self.nodes = 0
+        self.playouts = 0
+        self.cutoffs = {}
+        self.depth_reached = None
+        if self.telemetry is not None:
+            self.telemetry.begin(self)
+        if time_limit is None:
+            time_limit = self.time_limit
+        if clock is None:
+            clock = self.clock
+        if clock is not None:
+            allotted = clock.allot(state)
+            time_limit = allotted if time_limit is None else min(time_limit, allotted)
+
+        try:
+            # Answer at once when this position was searched while pondering
+            if self.ponder_cache and not pondering:
+                entry = self.ponder_cache.get((tuple(tuple(row) for row in state.grid), mode))
+                self.ponder_cache = {}
+                if entry is not None:
+                    reply, self.mcts_root = entry
+                    return reply
+
+            # Entries from earlier moves stay usable but become replaceable
+            if self.tt is not None:
+                self.tt.new_search()
+
+            # Killers are position specific; older history counts fade
+            self.killers.clear()
+            for cell in self.history:
+                self.history[cell] //= 2
+
+            # Small endgames are solved exactly by the tablebase
+            if self.tablebase is not None:
+                entry = self.tablebase.best_move(state)
+                if entry is not None:
+                    return entry[1]
+
+            if mode.lower() == "monte_carlo":
+                best_move = self.monte_carlo(state, simulations=20)
+                # If the best move creates a new region, return it immediately
+                if best_move.numRegions() < state.numRegions():
+                    return state
+
+                return best_move
+
+            # No possible moves
+            if not state.getPositions():
+                return state
 
+            if mode.lower() == "mcts":
+                return self.mcts(state, iterations=self.mcts_iterations, time_limit=time_limit)
+
+            # Every worker process grows its own tree; statistics are merged at the root
+            if mode.lower() == "parallel_mcts":
+                return self.parallel_mcts(state, iterations=self.mcts_iterations, time_limit=time_limit)
+
+            # One tree, with batches of playouts spread over worker processes
+            if mode.lower() == "leaf_parallel_mcts":
+                return self.mcts(state, iterations=self.mcts_iterations, time_limit=time_limit,
+                                 workers=self.workers or os.cpu_count() or 1)
+
+            # Parallel alpha-beta: workers share one transposition table
+            if mode.lower() == "lazy_smp":
+                return self.lazy_smp(state, search_depth, time_limit, max_depth)
+
+            # Play a win proven by proof-number search, otherwise search with alpha-beta
+            if mode.lower() == "pns":
+                if len(self.pn_table) > 1 << 20:
+                    self.pn_table.clear()
+                result, cell = solve(state, self.pns_nodes, None if time_limit is None else time_limit / 2,
+                                     self.pn_table)
+                if result:
+                    i, j = cell
+                    grid = [row[:] for row in state.grid]
+                    grid[i][j] -= 1
+                    return State(grid)
+                mode = "alpha_beta"
+                if time_limit is not None:
+                    time_limit = max(time_limit - (time.time() - start_time), 0.0)
+
+            if mode.lower() not in ("minimax", "alpha_beta", "hybrid", "pvs", "aspiration", "mtdf"):
+                # Ideally it will be the human player
+                raise ValueError(f"Unknown mode '{mode}'")
+
+            if time_limit is None:
+                # Aspiration windows and MTD(f) start from the previous iteration's score
+                if mode.lower() in ("aspiration", "mtdf"):
+                    return self.iterative_deepening(state, mode, None, max_depth=search_depth)
+                best_move = self.search_root(state, mode, search_depth)[0]
+                self.depth_reached = search_depth
+                return best_move
+            return self.iterative_deepening(state, mode, time_limit, max_depth)
+        finally:
+            if clock is not None:
+                clock.consume(time.time() - start_time)
+            if self.telemetry is not None:
+                self.telemetry.end(self, state, mode)
+
+    def move_async(self, state, mode, processes=False, **options):
+        """
+        Start move() in the background and return a Future of the resulting State.
+        By default the search runs on a thread owned by the agent, so it keeps its
+        transposition table and other state and one move runs at a time. With
+        processes=True it runs in the shared process pool on a fresh agent with the
+        same settings, which keeps the search from competing with the caller for the GIL.
+        :param options: Passed on to move().
+        """
+        # The caller may change its board while the search runs
+        state = State([row[:] for row in state.grid])
+        if processes:
+            settings = {name: getattr(self, name) for name in _AGENT_SETTINGS}
+            future = process_pool(self.workers).submit(_move_worker, state.grid, mode, settings, options)
+            result = Future()
+
+            def deliver(done):
+                # Hand back a State rather than the grid the worker returned
+                if result.cancelled():
+                    return
+                if done.exception() is not None:
+                    result.set_exception(done.exception())
+                else:
+                    result.set_result(State(done.result()))
+            future.add_done_callback(deliver)
+            return result
+
+        if self.move_executor is None:
+            self.move_executor = ThreadPoolExecutor(max_workers=1)
+        return self.move_executor.submit(self.move, state, mode, **options)
+
+    def move_many(self, states, mode, budget=None, workers=None, min_move_time=0.01, **options):
+        """
+        Answer a batch of positions, e.g. from many concurrent games, and return
+        the resulting States in order.
+        Identical and mirrored positions are searched once. The remaining ones are
+        spread over the shared process pool, with one transposition table in
+        shared memory and an evaluation cache per worker; with one worker (or a
+        mode that is parallel already) they are searched here, sharing this agent's tables.
+        :param budget: Seconds for the whole batch (None searches each position to a fixed depth).
+        :param workers: Processes to use (defaults to the agent's workers, then the CPU count).
+        :param min_move_time: Seconds each position still gets once the budget is used up.
+        :param options: Passed on to move(), e.g. search_depth.
+        """
+        deadline = None if budget is None else time.time() + budget
+
+        # Group the positions by canonical board
+        canonical = [canonical_board(state.grid) for state in states]
+        boards = list(dict.fromkeys(board for board, _ in canonical))
+
+        workers = min(workers or self.workers or os.cpu_count() or 1, len(boards))
+        if workers <= 1 or mode.lower() in ("parallel_mcts", "leaf_parallel_mcts", "lazy_smp"):
+            answers = self.answer_batch(boards, mode, deadline, options, min_move_time)
+        else:
+            table = None
+            if self.tt is not None:
+                if self.shared_tt is None:
+                    self.shared_tt = SharedTranspositionTable()
+                table = self.shared_tt
+                table.clear_stop()
+            settings = {name: getattr(self, name) for name in _AGENT_SETTINGS}
+            pool = process_pool(workers)
+            shares = [pool.submit(_move_many_worker, boards[worker::workers], mode, settings, options,
+                                  table, deadline, min_move_time)
+                      for worker in range(workers)]
+            answers = [None] * len(boards)
+            for worker, share in enumerate(shares):
+                answers[worker::workers] = share.result()
+
+        # Map each answer back onto the orientation it was asked in
+        answer_of = dict(zip(boards, answers))
+        return [State([list(row) for row in mirror_board(answer_of[board], *symmetry)])
+                for board, symmetry in canonical]
+
+    def answer_batch(self, boards, mode, deadline, options, min_move_time=0.01):
+        """
+        Play a move from each board (tuples of rows) with this agent and return the
+        resulting boards. The time left before deadline is split evenly over the
+        boards still to answer, but never below min_move_time, and region counts
+        are cached across the batch.
+        """
+        cache, self.eval_cache = self.eval_cache, {}
+        answers = []
+        try:
+            for index, board in enumerate(boards):
+                time_limit = None
+                if deadline is not None:
+                    time_limit = max((deadline - time.time()) / (len(boards) - index), min_move_time)
+                result = self.move(State([list(row) for row in board]), mode, time_limit=time_limit, **options)
+                answers.append(tuple(tuple(row) for row in result.grid))
+                # Keep the cache bounded on long batches
+                if len(self.eval_cache) > 1 << 20:
+                    self.eval_cache.clear()
+        finally:
+            self.eval_cache = cache
+        return answers
+
+    def ponder(self, state, mode, **options):
+        """
+        Search on the opponent's time.
+        state is the position with the opponent to move. A background thread works
+        out the agent's reply to each of their moves, most likely first, until the
+        next call to move(), which answers at once if the position played was covered.
+        :param options: Passed on to move() for each reply.
+        """
+        self.stop_pondering()
+        self.ponder_cache = {}
+        self.ponder_stop = threading.Event()
+        # Copy the board: a human move changes the game's State in place
+        state = State([row[:] for row in state.grid])
+        self.ponder_thread = threading.Thread(target=self._ponder, args=(state, mode, options), daemon=True)
+        self.ponder_thread.start()
+
+    def _ponder(self, state, mode, options):
+        # Pondered moves must not be charged to the clock or reported as played
+        telemetry, clock, should_stop = self.telemetry, self.clock, self.should_stop
+        self.telemetry, self.clock = None, None
+        self.should_stop = self.ponder_stop.is_set
+        # Each reply is searched from the tree kept after the agent's own move, which is
+        # put back afterwards for a reply that was not pondered
+        root = self.mcts_root
+        try:
+            regions = state.numRegions()
+            for _, child in self.ordered_children(state, parent_state=state):
+                # A move that wins for the opponent or empties the board needs no reply
+                if not child.getPositions() or child.numRegions() > regions:
+                    continue
+                self.mcts_root = root
+                try:
+                    reply = self.move(child, mode, **options)
+                except SearchTimeout:
+                    break
+                # A search cut short by the stop is not the reply move() would find
+                if self.ponder_stop.is_set():
+                    break
+                self.ponder_cache[(tuple(tuple(row) for row in child.grid), mode)] = (reply, self.mcts_root)
+        finally:
+            self.mcts_root = root
+            self.telemetry, self.clock, self.should_stop = telemetry, clock, should_stop
+
+    def stop_pondering(self):
+        """Stop the background search, keeping the replies it finished."""
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def cancel_moves(self):
+        """
+        Abort the searches started by move_async on the agent's thread and wait for
+        them to stop, e.g. before the program exits. Their results are discarded.
+        """
+        if self.move_executor is None:
+            return
+        should_stop = self.should_stop
+        self.should_stop = lambda: True
+        try:
+            self.move_executor.shutdown(wait=True)
+        finally:
+            self.should_stop = should_stop
+            self.move_executor = None
+
+    def search_root(self, state, mode, depth, first=None, shuffle_seed=None, guess=None):
+        """
+        Search every move from state with minimax, alpha-beta, hybrid, PVS,
+        aspiration windows or MTD(f).
+        :param first: Cell of the move to search first, e.g. the previous iteration's best.
+        :param shuffle_seed: When set, the other root moves are searched in a shuffled order.
+        :param guess: Expected score, e.g. the previous iteration's (aspiration and MTD(f)).
+        Returns (best_child, best_value, best_cell).
+        """
         # Get current number of regions
         current_regions = state.numRegions()
 
-        if mode.lower() == "monte_carlo":
-            best_move = self.monte_carlo(state, simulations=20)
-            # If the best move creates a new region, return it immediately
-            if best_move.numRegions() < state.numRegions():
-                return state
-
-            return best_move
-        
         # For minimax and alpha-beta pruning strategies
         best_move = None
         best_value = float('-inf')
+        best_pos = None
 
-        # Get all possible moves
-        possible_moves = list(state.moves())
-        if not possible_moves:
-            return state
+        # The root move is followed by depth more plies
+        horizon = None if mode.lower() == "hybrid" else depth + 1
+        ordered_children = self.ordered_children(state, parent_state=state, first=first, depth=horizon)
+        if shuffle_seed is not None:
+            rng = random.Random(shuffle_seed)
+            ordered_children.sort(key=lambda item: (item[0] != first, rng.random()))
+
+        # If a move creates a new region, return it immediately
+        for pos, child in ordered_children:
+            if child.numRegions() > current_regions:
+                return child, float('inf'), pos
+
+        # These modes share alpha (and the bounds found) between the root moves
+        if mode.lower() == "pvs":
+            return self.root_window(state, ordered_children, depth, float('-inf'), float('inf'))
+        if mode.lower() == "aspiration":
+            return self.aspiration(state, ordered_children, depth, guess)
+        if mode.lower() == "mtdf":
+            return self.mtdf(state, ordered_children, depth, guess)
 
         # Evaluate each possible move
-        for child in self.ordered_moves(state, parent_state=state):
+        for pos, child in ordered_children:
             
             # Minimax Strategy
             if mode.lower() == "minimax":
-                value = self.minimax(child, depth=search_depth, is_maximizing=False, parent_state=state)
+                value = self.minimax(child, depth=depth, is_maximizing=False, parent_state=state)
 
             # Alpha Beta Pruning Strategy
             elif mode.lower() == "alpha_beta":
-                value = self.alphabeta(child, depth=search_depth, alpha=float('-inf'), beta=float('inf'),
+                value = self.alphabeta(child, depth=depth, alpha=float('-inf'), beta=float('inf'),
                                     is_maximizing=False, parent_state=state)
                 
             elif mode.lower() == "hybrid":
-                value = self.hybrid(child, depth=search_depth, alpha=float('-inf'), beta=float('inf'),
+                value = self.hybrid(child, depth=depth, alpha=float('-inf'), beta=float('inf'),
                                                is_maximizing=False, parent_state=state, sims=10)
                 
             else: # Ideally it will be the human player
                 raise ValueError(f"Unknown mode '{mode}'")
             
-            # If this move creates a new region, return it immediately
-            if child.numRegions() > current_regions:
-                return child
-            
             # Update best move if curr move is better
             if value > best_value:
                 best_value = value
                 best_move = child
+                best_pos = pos
+        return best_move, best_value, best_pos
+
+    def iterative_deepening(self, state, mode, time_limit, max_depth=None, start_depth=0, shuffle_seed=None):
+        """
+        Search one ply deeper at a time until the time limit runs out.
+        The best move of the deepest completed iteration is returned; an
+        iteration cut off by the deadline (or should_stop) is discarded.
+        :param time_limit: Seconds to search, or None to run every depth up to max_depth.
+        """
+        # Searching deeper than the counters on the board gains nothing
+        if max_depth is None:
+            max_depth = sum(sum(row) for row in state.grid)
+
+        best_move = None
+        best_value = None
+        best_pos = None
+        self.deadline = None if time_limit is None else time.time() + time_limit
+        try:
+            for depth in range(start_depth, max_depth + 1):
+                best_move, best_value, best_pos = self.search_root(state, mode, depth, first=best_pos,
+                                                                   shuffle_seed=shuffle_seed,
+                                                                   guess=best_value)
+                self.depth_reached = depth
+                # A move that wins immediately needs no deeper search
+                if best_value == float('inf'):
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+
+        # Not even the shallowest iteration finished: play the best-ordered move
+        if best_move is None:
+            best_move = self.ordered_moves(state, parent_state=state)[0]
         return best_move
 
+    def root_window(self, state, children, depth, alpha, beta):
+        """
+        Search the root moves with PVS inside (alpha, beta). Alpha rises as better
+        moves are found, so after the first move the others only need a null-window
+        search proving they are no better.
+        Returns (best_child, best_value, best_cell); a best_value outside the window
+        is only a bound.
+        """
+        best = (None, float('-inf'), None)
+        for index, (pos, child) in enumerate(children):
+            if index == 0:
+                value = self.pvs(child, depth, alpha, beta, False, parent_state=state)
+            else:
+                value = self.pvs(child, depth, alpha, alpha + NULL_WINDOW, False, parent_state=state)
+                # Better than the best so far: find out by how much
+                if alpha < value < beta:
+                    value = self.pvs(child, depth, alpha, beta, False, parent_state=state)
+            if value > best[1]:
+                best = (child, value, pos)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best
+
+    def aspiration(self, state, children, depth, guess=None):
+        """
+        Root search with an aspiration window around guess. When the score falls
+        outside the window the failing side is opened up and the search repeated.
+        """
+        if guess is None or math.isinf(guess):
+            return self.root_window(state, children, depth, float('-inf'), float('inf'))
+
+        alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+        while True:
+            best = self.root_window(state, children, depth, alpha, beta)
+            if best[1] <= alpha:
+                alpha = float('-inf')
+            elif best[1] >= beta:
+                beta = float('inf')
+            else:
+                return best
+
+    def mtdf(self, state, children, depth, guess=None):
+        """
+        MTD(f): converge on the root score with null-window searches only.
+        Each pass tells whether the score is above or below its window and the
+        transposition table keeps the passes from repeating each other's work.
+        """
+        g = 0.0 if guess is None or math.isinf(guess) else guess
+        lower, upper = float('-inf'), float('inf')
+        step = ASPIRATION_WINDOW
+        best = None
+        beta = g
+        while lower < upper:
+            beta = max(beta, lower + NULL_WINDOW)
+            result = self.root_window(state, children, depth, beta - NULL_WINDOW, beta)
+            g = result[1]
+            if g < beta:
+                upper = g
+            else:
+                # Only a pass that fails high proves which move reaches the score
+                lower = g
+                best = result
+
+            # Evaluations are fine grained, so stepping from bound to bound can take
+            # many passes: bisect once the score is bracketed, else step out further
+            if not math.isinf(lower) and not math.isinf(upper):
+                beta = (lower + upper) / 2
+            else:
+                beta = g - step if g < beta else g + step
+                step *= 2
+        return best if best is not None else result
+
+    def check_deadline(self):
+        """Abort the current search once its deadline has passed or a stop was requested."""
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+        if self.should_stop is not None and self.should_stop():
+            raise SearchTimeout()
+
+    def lazy_smp(self, state, search_depth=3, time_limit=None, max_depth=None, workers=None):
+        """
+        Parallel alpha-beta (Lazy SMP).
+        Helper processes run the same iterative-deepening alpha-beta from the
+        root at staggered depths and move orders, all sharing one lock-free
+        transposition table in shared memory. This process runs the main
+        search, which finds most of its subtrees already in the table, and
+        its result is played; the helpers are stopped once it finishes.
+        :param workers: Total processes searching, including this one.
+        """
+        workers = workers or self.workers or os.cpu_count() or 1
+        if self.shared_tt is None:
+            self.shared_tt = SharedTranspositionTable()
+        table = self.shared_tt
+        table.new_search()
+        table.clear_stop()
+
+        settings = {name: getattr(self, name) for name in _AGENT_SETTINGS}
+        pool = process_pool(workers)
+        helpers = [pool.submit(_lazy_smp_worker, state.grid, table, settings, helper,
+                               search_depth, time_limit)
+                   for helper in range(1, workers)]
+
+        local_tt, self.tt = self.tt, table
+        try:
+            if time_limit is None:
+                return self.iterative_deepening(state, "alpha_beta", None, max_depth=search_depth)
+            return self.iterative_deepening(state, "alpha_beta", time_limit, max_depth=max_depth)
+        finally:
+            self.tt = local_tt
+            table.request_stop()
+            for helper in helpers:
+                helper.result()
+
     # Order moves to prioritize those that increase regions and hingers
-    def ordered_moves(self, state, parent_state=None):
+    def ordered_moves(self, state, parent_state=None, depth=None):
         """Orders moves based on their evaluation scores."""
-        moves = list(state.moves())
-        return sorted(moves, key=lambda s: self.evaluate(s, parent_state), reverse=True)
+        return [child for _, child in self.ordered_children(state, parent_state, depth=depth)]
 
+    def ordered_children(self, state, parent_state=None, first=None, depth=None, collapse=True):
+        """
+        Like ordered_moves, but returns ((i, j), child) pairs.
+        :param first: Cell whose move is searched first, e.g. the best move from the transposition table.
+        :param depth: Moves left in the search including this one, used by collapse_moves and
+            the killer moves.
+        :param collapse: Allow collapse_moves to drop equivalent moves.
+        """
+        children = self.children(state, depth if collapse else None, first)
+        if self.move_ordering == "history":
+            # Cheap dynamic ordering: killers of this depth, then cells with the most cutoffs
+            killers = self.killers.get(depth, ())
+            history = self.history
+            children.sort(key=lambda item: (item[0] == first, item[0] in killers, history.get(item[0], 0)),
+                          reverse=True)
+            return children
+
+        children.sort(key=lambda item: self.evaluate(item[1], parent_state), reverse=True)
+        if first is not None:
+            for index, (pos, _) in enumerate(children):
+                if pos == first:
+                    children.insert(0, children.pop(index))
+                    break
+        return children
+
+    def selective_depth(self, state, pos, index, depth, extensions):
+        """
+        Return (depth, extended) for the child reached by the move on pos, the index-th
+        move searched from state with depth plies left.
+        Emptying a cell changes connectivity, and taking a cut cell down to one counter
+        hands the opponent a win, so these moves are extended. Decrements of cells with
+        more counters cannot do either and are reduced once they come late in the order.
+        """
+        if not self.selective:
+            return depth - 1, False
+        i, j = pos
+        count = state.grid[i][j]
+        if count == 1 or (count == 2 and ring_groups(state.grid, i, j) >= 2):
+            if extensions < self.max_extensions:
+                return depth - 1 + self.extension, True
+        elif index >= self.lmr_full_moves and depth >= self.lmr_min_depth:
+            return max(depth - 1 - self.lmr_reduction, 0), False
+        return depth - 1, False
+
+    def record_cutoff(self, pos, depth, index):
+        """
+        Remember a move that caused a cutoff with depth moves left, for the history ordering.
+        :param index: Position of the move in the search order, counted for telemetry.
+        """
+        self.cutoffs[index] = self.cutoffs.get(index, 0) + 1
+        if self.move_ordering != "history":
+            return
+        killers = self.killers.setdefault(depth, [])
+        if pos not in killers:
+            killers.insert(0, pos)
+            del killers[2:]
+        self.history[pos] = self.history.get(pos, 0) + depth * depth
+
+    def children(self, state, depth=None, first=None):
+        """
+        Return the ((i, j), child) pairs to search from state.
+        With collapse_moves set and depth moves left in the search, a cell holding more
+        than depth counters stays active until the horizon whoever plays on it. Every
+        move on such a cell leads to a subtree with the same regions and active cells,
+        so only one of them is searched. Moves that can empty a cell are all kept.
+        :param first: Preferred representative, e.g. the transposition table's best move.
+        """
+        if depth is None or not self.collapse_moves:
+            return list(state.movesWithPositions())
+
+        grid = state.grid
+        kept = []
+        representative = None
+        for (i, j) in state.getPositions():
+            if grid[i][j] <= depth:
+                kept.append((i, j))
+            elif representative is None or (i, j) == first:
+                representative = (i, j)
+        if representative is not None:
+            kept.append(representative)
+
+        children = []
+        for (i, j) in kept:
+            new_grid = [row[:] for row in grid]
+            new_grid[i][j] -= 1
+            children.append(((i, j), State(new_grid)))
+        return children
+
+    def regions(self, state):
+        """state.numRegions(), looked up in the evaluation cache while one is kept."""
+        cache = self.eval_cache
+        if cache is None:
+            return state.numRegions()
+        key = tuple(tuple(row) for row in state.grid)
+        count = cache.get(key)
+        if count is None:
+            count = cache[key] = state.numRegions()
+        return count
 
     def evaluate(self, state, parent_state):
         """
         Evaluation function that rewards new region creation and penalizes hingers.
         """
-        regions = state.numRegions()
+        regions = self.regions(state)
         
         if parent_state:
-            parent_regions = parent_state.numRegions()
+            parent_regions = self.regions(parent_state)
         else:
             parent_regions = 0
 
@@ -114,93 +1434,259 @@ class Agent:
         # Reward formula 
         reward = (15 * region_diff) - (0.5 * hingers)
 
-        # Add a small random tie-breaker to diversify paths
-        reward += random.uniform(-0.1, 0.1)
+        # Add a small tie-breaker to diversify paths. It is derived from the position
+        # (with a per-agent seed) rather than drawn at random, so a transposed position
+        # always gets the same value and cached search results stay consistent.
+        noise_key = hash((self.noise_seed, tuple(tuple(row) for row in state.grid), parent_regions))
+        reward += (noise_key % 2001 - 1000) / 10000
         return reward
     
     def minimax(self, state, depth, is_maximizing, parent_state=None):
+        self.check_deadline()
+        self.nodes += 1
+
         # Terminal state or max depth
-        if depth == 0 or not list(state.moves()):
+        if depth == 0 or not state.getPositions():
             # Utilise evaulation function
             return self.evaluate(state, parent_state)
 
+        # A known draw, as in alphabeta
+        if depth > 1 and parity_result(state) is not None:
+            return 0.0
+
+        # Below the leaves the value only depends on the position itself,
+        # so a transposed position can reuse an earlier result
+        key = None
+        if self.tt is not None:
+            key = self.tt.key(state, is_maximizing)
+            entry = self.tt.probe(key)
+            if entry is not None and entry[1] >= depth and entry[3] == EXACT:
+                return entry[2]
+
         # Maximizing Agent Turn
         if is_maximizing:
             max_eval = float('-inf')
+            best_move = None
 
             # Iterate through all children states
-            for child in state.moves():
+            for pos, child in self.children(state, depth):
                 # recusive call to minimax
                 eval = self.minimax(child, depth-1, False, parent_state=state)
 
                 # update the maximum evaluation
-                max_eval = max(max_eval, eval)
-            return max_eval
+                if eval > max_eval:
+                    max_eval = eval
+                    best_move = pos
+            value = max_eval
         else: # Minimizing Agent Turn
             min_eval = float('inf')
+            best_move = None
 
             # Iterate through all children states
-            for child in state.moves():
+            for pos, child in self.children(state, depth):
                 # recursive call to minimax
                 eval = self.minimax(child, depth-1, True, parent_state=state)
 
                 # update the minimum evaluation
-                min_eval = min(min_eval, eval)
-            return min_eval
+                if eval < min_eval:
+                    min_eval = eval
+                    best_move = pos
+            value = min_eval
+
+        if key is not None:
+            self.tt.store(key, depth, value, EXACT, best_move)
+        return value
 
-    def alphabeta(self, state, depth, alpha, beta, is_maximizing, parent_state=None):
+    def alphabeta(self, state, depth, alpha, beta, is_maximizing, parent_state=None, extensions=0):
         """
             Alpha–beta pruning’s goal is to avoid exploring parts of the 
             search tree that can’t affect the final decision.
+            :param extensions: Extensions used on the line to this node (selective search).
         """
+        self.check_deadline()
+        self.nodes += 1
+
+        # Selective search: a player who can split a region wins, at any depth
+        if self.selective and winning_cells(state):
+            return WIN_SCORE if is_maximizing else -WIN_SCORE
+
         # Terminal state or max depth
-        if depth == 0 or not list(state.moves()):
+        if depth == 0 or not state.getPositions():
             return self.evaluate(state, parent_state)
 
+        # Once no region can split, the rest of the game is a known draw (only
+        # checked where there is more than one ply left to save)
+        if depth > 1 and parity_result(state) is not None:
+            return 0.0
+
+        # Transposition table lookup: reuse a result searched at least as deep
+        # when its bound settles this window, otherwise just take its best move
+        key = None
+        tt_move = None
+        if self.tt is not None:
+            key = self.tt.key(state, is_maximizing)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                _, tt_depth, tt_value, tt_flag, tt_move, _ = entry
+                if tt_depth >= depth:
+                    if tt_flag == EXACT:
+                        return tt_value
+                    if tt_flag == LOWER and tt_value >= beta:
+                        return tt_value
+                    if tt_flag == UPPER and tt_value <= alpha:
+                        return tt_value
+        alpha_orig, beta_orig = alpha, beta
+
         # Move ordering improves alpha–beta efficiency 
         # by exploring strong moves first, causing
         # earlier pruning and fewer nodes to be evaluated.
-        ordered_children = self.ordered_moves(state, parent_state)
+        # Extensions can carry the line past depth, so collapsing must allow for them
+        horizon = depth + (self.max_extensions - extensions) * self.extension if self.selective else depth
+        ordered_children = self.ordered_children(state, parent_state, first=tt_move, depth=horizon)
+        best_move = None
         
         # Maximizing Agent Turn
         if is_maximizing:
             max_eval = float('-inf')
 
             # Iterate through all ordered children states
-            for child in ordered_children:
+            for index, (pos, child) in enumerate(ordered_children):
+                child_depth, extended = self.selective_depth(state, pos, index, depth, extensions)
 
                 # Max Turn: recusive call to alphabeta pruning strategy
-                eval = self.alphabeta(child, depth-1, alpha, beta, False, parent_state=state)
+                eval = self.alphabeta(child, child_depth, alpha, beta, False, parent_state=state,
+                                      extensions=extensions + extended)
+
+                # A reduced move that looks better is searched again at full depth
+                if child_depth < depth - 1 and eval > alpha:
+                    eval = self.alphabeta(child, depth-1, alpha, beta, False, parent_state=state,
+                                          extensions=extensions)
 
                 # update the maximum evaluation
-                max_eval = max(max_eval, eval)
+                if eval > max_eval:
+                    max_eval = eval
+                    best_move = pos
 
                 # Update alpha value for pruning
                 alpha = max(alpha, eval)
 
                 # Cuts off the remaining branches when the outcome won't get affected
                 if beta <= alpha:
+                    self.record_cutoff(pos, depth, index)
                     break
-            return max_eval
+            value = max_eval
         else: # Minimising Agent Turn
             min_eval = float('inf')
 
             # Iterate through all ordered children states
-            for child in ordered_children:
+            for index, (pos, child) in enumerate(ordered_children):
+                child_depth, extended = self.selective_depth(state, pos, index, depth, extensions)
 
                  # Min Turn: recursive call to alphabeta pruning strategy
-                eval = self.alphabeta(child, depth-1, alpha, beta, True, parent_state=state)
+                eval = self.alphabeta(child, child_depth, alpha, beta, True, parent_state=state,
+                                      extensions=extensions + extended)
+
+                # A reduced move that looks better is searched again at full depth
+                if child_depth < depth - 1 and eval < beta:
+                    eval = self.alphabeta(child, depth-1, alpha, beta, True, parent_state=state,
+                                          extensions=extensions)
 
                 # update the minimum evaluation
-                min_eval = min(min_eval, eval)
+                if eval < min_eval:
+                    min_eval = eval
+                    best_move = pos
                 
                 # Update beta value for pruning
                 beta = min(beta, eval)
 
                 # Cuts off the remaining branches when the outcome won't get affected
                 if beta <= alpha:
+                    self.record_cutoff(pos, depth, index)
                     break
-            return min_eval
+            value = min_eval
+
+        # A value outside the original window is only a bound on the true value
+        if key is not None:
+            if value <= alpha_orig:
+                flag = UPPER
+            elif value >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, value, flag, best_move)
+        return value
+
+    def pvs(self, state, depth, alpha, beta, is_maximizing, parent_state=None):
+        """
+        Principal-variation search (NegaScout).
+        The first, best-ordered child is searched with the full window and the
+        rest with a null window, re-searching only those that turn out better.
+        """
+        self.check_deadline()
+        self.nodes += 1
+
+        # Terminal state or max depth
+        if depth == 0 or not state.getPositions():
+            return self.evaluate(state, parent_state)
+
+        # A known draw, as in alphabeta
+        if depth > 1 and parity_result(state) is not None:
+            return 0.0
+
+        key = None
+        tt_move = None
+        if self.tt is not None:
+            key = self.tt.key(state, is_maximizing)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                _, tt_depth, tt_value, tt_flag, tt_move, _ = entry
+                if tt_depth >= depth:
+                    if tt_flag == EXACT:
+                        return tt_value
+                    if tt_flag == LOWER and tt_value >= beta:
+                        return tt_value
+                    if tt_flag == UPPER and tt_value <= alpha:
+                        return tt_value
+        alpha_orig, beta_orig = alpha, beta
+
+        best_value = float('-inf') if is_maximizing else float('inf')
+        best_move = None
+        ordered_children = self.ordered_children(state, parent_state, first=tt_move, depth=depth)
+        for index, (pos, child) in enumerate(ordered_children):
+            if index == 0:
+                value = self.pvs(child, depth-1, alpha, beta, not is_maximizing, parent_state=state)
+            elif is_maximizing:
+                value = self.pvs(child, depth-1, alpha, alpha + NULL_WINDOW, False, parent_state=state)
+                if alpha < value < beta:
+                    value = self.pvs(child, depth-1, alpha, beta, False, parent_state=state)
+            else:
+                value = self.pvs(child, depth-1, beta - NULL_WINDOW, beta, True, parent_state=state)
+                if alpha < value < beta:
+                    value = self.pvs(child, depth-1, alpha, beta, True, parent_state=state)
+
+            if is_maximizing:
+                if value > best_value:
+                    best_value, best_move = value, pos
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_move = value, pos
+                beta = min(beta, value)
+
+            # Cuts off the remaining branches when the outcome won't get affected
+            if beta <= alpha:
+                self.record_cutoff(pos, depth, index)
+                break
+
+        if key is not None:
+            if best_value <= alpha_orig:
+                flag = UPPER
+            elif best_value >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, best_value, flag, best_move)
+        return best_value
 
     def monte_carlo(self, state, simulations, max_depth=10):
         """
@@ -214,17 +1700,9 @@ class Agent:
         if not possible_moves:
             return state
     
-        move_scores = {}
-
-        # Perform simulations for each move
-        for move in possible_moves:
-            total_score = 0
-            for _ in range(simulations):
-                # simulate a radnom playout from the move
-                total_score += self.simulate_random_playout(move, max_depth)
-
-            # Accumulate scores by obtaining the average
-            move_scores[move] = total_score / simulations
+        # Average score of the random playouts from each move
+        scores = self.playout_scores(possible_moves, simulations, max_depth)
+        move_scores = dict(zip(possible_moves, scores))
 
         # Pick the move with the highest average score
         best_move = max(move_scores, key=move_scores.get)
@@ -235,29 +1713,233 @@ class Agent:
     
         return best_move
     
-    def hybrid(self, state, depth, alpha, beta, is_maximizing, parent_state=None, sims=10):
+    def mcts(self, state, iterations=1000, time_limit=None, exploration=1.4, workers=None):
+        """
+        UCT Monte Carlo Tree Search.
+        Grows a search tree by repeatedly selecting the most promising node
+        (UCB1), expanding one move, playing the game out at random and
+        backing the result up the tree. The subtree of the position actually
+        reached is kept and reused on the next call.
+        :param iterations: Playouts to run when there is no time limit.
+        :param time_limit: Seconds to search for instead of a fixed iteration count.
+        :param exploration: UCB1 exploration constant.
+        :param workers: When set, playouts run in batches on this many worker processes.
+        """
+        root = self.reuse_mcts_tree(state)
+
+        # A move that creates a new region wins straight away
+        for pos, child in state.movesWithPositions():
+            if child.numRegions() > root.regions:
+                self.mcts_root = None
+                return child
+
+        deadline = None if time_limit is None else time.time() + time_limit
+        self.mcts_search(root, iterations, deadline, exploration, workers=workers)
+
+        # No time for a single iteration: play any legal move
+        if not root.children:
+            self.mcts_root = None
+            return next(state.moves(), None)
+
+        # Play the most visited move and keep its subtree for the next call
+        best = max(root.children, key=lambda child: child.visits)
+        best.parent = None
+        self.mcts_root = best
+        return best.state
+
+    def mcts_search(self, root, iterations, deadline=None, exploration=1.4, workers=None):
+        """
+        Run UCT iterations from root until the iteration count or deadline is reached.
+        With workers, leaves are selected in batches and played out on a process
+        pool. Each selected path is given a visit straight away (a virtual loss)
+        so the rest of the batch spreads to other branches; the rewards are
+        added once the batch has been played out.
+        """
+        pool = process_pool(workers) if workers else None
+        batch_size = 8 * workers if workers else 1
+        count = 0
+        while (count < iterations) if deadline is None else (time.time() < deadline):
+            # A stop request ends the search with the statistics gathered so far
+            if self.should_stop is not None and self.should_stop():
+                break
+            leaves = []
+            while len(leaves) < batch_size and (deadline is not None or count < iterations):
+                count += 1
+                node = root
+                node.visits += 1
+
+                # Selection: descend through fully expanded nodes
+                while node.result is None and not node.untried and node.children:
+                    node = node.uct_child(exploration)
+                    node.visits += 1
+
+                # Expansion: add one untried move
+                if node.result is None and node.untried:
+                    pos, child_state = node.untried.pop()
+                    child = MCTSNode(child_state, parent=node, move=pos)
+                    child.visits = 1
+                    node.children.append(child)
+                    node = child
+
+                leaves.append(node)
+
+            # Simulation: result for the player who moved into each leaf
+            pending = [leaf for leaf in leaves if leaf.result is None]
+            self.playouts += len(pending)
+            if pool is not None and len(pending) > 1:
+                chunks = [pending[i::workers] for i in range(min(workers, len(pending)))]
+                results = {}
+                grids = [[leaf.state.grid for leaf in chunk] for chunk in chunks]
+                for chunk, chunk_results in zip(chunks, pool.map(_playout_worker, grids)):
+                    for leaf, reward in zip(chunk, chunk_results):
+                        results[id(leaf)] = reward
+            else:
+                results = {id(leaf): self.playout_result(leaf.state) for leaf in pending}
+
+            # Backpropagation: the players alternate going up the tree
+            for leaf in leaves:
+                reward = leaf.result if leaf.result is not None else results[id(leaf)]
+                node = leaf
+                while node is not None:
+                    node.wins += reward
+                    reward = 1.0 - reward
+                    node = node.parent
+        self.nodes += count
+
+    def parallel_mcts(self, state, iterations=1000, time_limit=None, workers=None, exploration=1.4):
+        """
+        Root-parallel MCTS: every worker process grows its own tree from state
+        with its own random playouts, and the root statistics of all trees are
+        summed to pick the move.
+        :param iterations: Playouts per worker when there is no time limit.
+        :param workers: Worker processes (defaults to the agent's workers, then the CPU count).
+        """
+        regions = state.numRegions()
+        children = list(state.movesWithPositions())
+
+        # A move that creates a new region wins straight away
+        for pos, child in children:
+            if child.numRegions() > regions:
+                return child
+
+        workers = workers or self.workers or os.cpu_count() or 1
+        pool = process_pool(workers)
+        futures = [pool.submit(_root_mcts_worker, state.grid, iterations, time_limit, exploration)
+                   for _ in range(workers)]
+
+        # Merge the root statistics of every tree
+        visits = {}
+        for future in futures:
+            for move, move_visits, _ in future.result():
+                visits[move] = visits.get(move, 0) + move_visits
+
+        # The trees are not kept, so there is nothing to reuse next move
+        self.mcts_root = None
+
+        # No tree got an iteration in: play any legal move
+        if not visits:
+            return children[0][1] if children else None
+
+        best = max(visits, key=visits.get)
+        for pos, child in children:
+            if pos == best:
+                return child
+
+    def reuse_mcts_tree(self, state):
+        """
+        Return the node for state from the tree kept after the last move
+        (our move or the opponent's reply to it), or a fresh root.
+        """
+        key = state.grid
+        previous = self.mcts_root
+        if previous is not None:
+            candidates = [previous] + previous.children
+            for child in previous.children:
+                candidates.extend(child.children)
+            for node in candidates:
+                if node.state.grid == key:
+                    node.parent = None
+                    # A settled node was left unexpanded; as the root it needs children
+                    if node.result == 0.5 and node.untried:
+                        node.result = None
+                    return node
+        return MCTSNode(State([row[:] for row in state.grid]))
+
+    def playout_result(self, state):
+        """
+        Play random moves from state until someone creates a new region or the
+        board is empty. Returns 1 if the player who moved into state wins,
+        0 if the player to move wins and 0.5 for a draw.
+        """
+        if parity_result(state) is not None:
+            return 0.5
+
+        if self.playout == "kernel":
+            moves, _, _, won = PlayoutKernel(state.grid).playout()
+            if not won:
+                return 0.5
+            # An odd number of moves means the player to move made the winning one
+            return 0.0 if moves % 2 else 1.0
+
+        grid = [row[:] for row in state.grid]
+        board = State(grid)
+        regions = board.numRegions()
+        active = board.getPositions()
+
+        # 0 while the player to move in state is playing, 1 for the other player
+        turn = 0
+        while active:
+            index = random.randrange(len(active))
+            i, j = active[index]
+            grid[i][j] -= 1
+
+            # Only emptying a cell can change the regions
+            if grid[i][j] == 0:
+                active[index] = active[-1]
+                active.pop()
+                new_regions = board.numRegions()
+                if new_regions > regions:
+                    return 0.0 if turn == 0 else 1.0
+                regions = new_regions
+
+                # Nobody can split a region any more: the rest is a draw
+                if parity_result(board) is not None:
+                    return 0.5
+            turn ^= 1
+        return 0.5
+
+    def hybrid(self, state, depth, alpha, beta, is_maximizing, parent_state=None, sims=10, extensions=0):
         """
         A Hybrid between Monte Carlo and Alpha-Beta pruning strategies.
         Uses Alpha-Beta pruning for pruning and structure,
         but Monte Carlo simulations for evaluating leaf nodes
         """
+        self.check_deadline()
+        self.nodes += 1
+
+        # Selective search: a player who can split a region wins, at any depth
+        if self.selective and winning_cells(state):
+            return WIN_SCORE if is_maximizing else -WIN_SCORE
+
         if depth == 0 or not list(state.moves()):
-            total_score = 0
-            for _ in range(sims):
-                total_score += self.simulate_random_playout(state, max_depth=5)
-            return total_score / sims
+            return self.playout_scores([state], sims, max_depth=5)[0]
 
-        ordered_children = self.ordered_moves(state, parent_state)
+        ordered_children = self.ordered_children(state, parent_state, depth=depth, collapse=False)
 
         # Maximizing Agent Turn
         if is_maximizing:
             max_eval = float('-inf')
 
             # Iterate through all ordered children states
-            for child in ordered_children:
+            for index, (pos, child) in enumerate(ordered_children):
+                child_depth, extended = self.selective_depth(state, pos, index, depth, extensions)
 
                 # Max Turn: recusive call to alphabeta pruning strategy
-                eval = self.hybrid(child, depth-1, alpha, beta, True, parent_state=state, sims=sims)
+                eval = self.hybrid(child, child_depth, alpha, beta, False, parent_state=state, sims=sims,
+                                   extensions=extensions + extended)
+                if child_depth < depth - 1 and eval > alpha:
+                    eval = self.hybrid(child, depth-1, alpha, beta, False, parent_state=state, sims=sims,
+                                       extensions=extensions)
 
                 # update the maximum evaluation
                 max_eval = max(max_eval, eval)
@@ -267,16 +1949,22 @@ class Agent:
 
                 # Cuts off the remaining branches when the outcome won't get affected
                 if beta <= alpha:
+                    self.record_cutoff(pos, depth, index)
                     break
             return max_eval
         else: # Minimising Agent Turn
             min_eval = float('inf')
 
             # Iterate through all ordered children states
-            for child in ordered_children:
+            for index, (pos, child) in enumerate(ordered_children):
+                child_depth, extended = self.selective_depth(state, pos, index, depth, extensions)
 
                  # Min Turn: recursive call to alphabeta pruning strategy
-                eval = self.hybrid(child, depth-1, alpha, beta, True, parent_state=state, sims=sims)
+                eval = self.hybrid(child, child_depth, alpha, beta, True, parent_state=state, sims=sims,
+                                   extensions=extensions + extended)
+                if child_depth < depth - 1 and eval < beta:
+                    eval = self.hybrid(child, depth-1, alpha, beta, True, parent_state=state, sims=sims,
+                                       extensions=extensions)
 
                 # update the minimum evaluation
                 min_eval = min(min_eval, eval)
@@ -286,17 +1974,47 @@ class Agent:
 
                 # Cuts off the remaining branches when the outcome won't get affected
                 if beta <= alpha:
+                    self.record_cutoff(pos, depth, index)
                     break
             return min_eval
         
 
+    def playout_scores(self, states, simulations, max_depth=10):
+        """
+        Return the mean score of simulations random playouts from each state.
+        """
+        if self.playout == "batch" and np is not None:
+            self.playouts += len(states) * simulations
+            return batch_playout_scores([s.grid for s in states], simulations, max_depth)
+
+        if self.playout == "kernel":
+            self.playouts += len(states) * simulations
+            scores = []
+            for state in states:
+                kernel = PlayoutKernel(state.grid)
+                scores.append(sum(kernel.score(max_depth) for _ in range(simulations)) / simulations)
+            return scores
+
+        scores = []
+        for state in states:
+            total_score = 0
+            for _ in range(simulations):
+                # simulate a random playout from the state
+                total_score += self.simulate_random_playout(state, max_depth)
+            scores.append(total_score / simulations)
+        return scores
+
     def simulate_random_playout(self, state, max_depth=10):
         """
         Simulates a random playout from the given state until the end or max depth.
         Returns a score based on the final state's evaluation.
         """
+        self.playouts += 1
+        if self.playout == "kernel":
+            return PlayoutKernel(state.grid).score(max_depth)
+
         current_state = state
-        initial_regions = state.numRegions()
+        regions = state.numRegions()
 
         # Play randomly until no moves left or depth reached
         for depth in range(max_depth):
@@ -306,13 +2024,15 @@ class Agent:
             if not moves:
                 break
 
-            # Choose a random move
-            next_state = random.choice(moves)
+            # Choose a random move and play it
+            current_state = random.choice(moves)
 
-            # Stop immediately if a new region is found
-            if next_state.numRegions() > state.numRegions():
-                current_state = next_state
+            # Stop immediately if the move split a region (compared with the position
+            # before it, as the game rules do)
+            new_regions = current_state.numRegions()
+            if new_regions > regions:
                 break
+            regions = new_regions
         # Use your existing evaluation function
         return self.evaluate(current_state, parent_state=state)
 
@@ -331,8 +2051,12 @@ def time_strategy(agent, state, mode):
     elapsed = end_time - start_time
     return next_state, elapsed
 
-def test_all_strategies():
-    """Demonstrates all strategies implemented"""
+def test_all_strategies(telemetry_path=None):
+    """
+    Demonstrates all strategies implemented
+    :param telemetry_path: JSONL file to append the per-move search statistics to, e.g.
+        DEFAULT_TELEMETRY_PATH (None, the default, records nothing).
+    """
     print("Demonstrating all strategies to compare to each other\n")
 
     start_board = State(None)
@@ -342,7 +2066,9 @@ def test_all_strategies():
     print(f"Initial number of regions: {initial_regions}\n")
 
     # Create an agent
-    agent = Agent(state=start_board, modes=["minimax", "alpha_beta", "monte_carlo", "hybrid"], name="Strategy Testing")
+    telemetry = Telemetry(telemetry_path) if telemetry_path else None
+    agent = Agent(state=start_board, modes=["minimax", "alpha_beta", "monte_carlo", "hybrid"], name="Strategy Testing",
+                  telemetry=telemetry)
     print(agent)
 
     strategies = ["minimax", "alpha_beta", "monte_carlo", "hybrid"]
@@ -376,6 +2102,50 @@ def test_all_strategies():
         if current_state.numRegions() < initial_regions:
             print(f"FAILED: {mode} did not create a new region.\n")
 
+    if telemetry is not None:
+        telemetry.close()
+        print(f"Search telemetry written to {telemetry_path}")
+
+def test_playout_kernel(playouts=20000, scored=4000):
+    """
+    Checks that kernel playouts end in the same outcomes, about as often, as the
+    State-based playouts, and that the kernel (and NumPy, when installed) playout
+    scores average the same as simulate_random_playout.
+    """
+    boards = [
+        [[1, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 1, 1, 1, 0]],
+        [[1, 1, 0, 0, 2], [1, 1, 0, 0, 0], [0, 0, 1, 1, 1], [0, 0, 0, 1, 1]],
+        [[2, 1, 0, 2, 1], [1, 2, 4, 2, 1], [0, 0, 0, 4, 1], [1, 1, 1, 0, 0]],
+        [[2, 0, 0, 0, 3], [1, 0, 0, 0, 1], [0, 0, 0, 0, 0], [0, 3, 0, 0, 0]],
+    ]
+    for grid in boards:
+        counts = {}
+        for engine in ("state", "kernel"):
+            agent = Agent(state=State(grid), tt_size=0, playout=engine)
+            outcomes = {0.0: 0, 0.5: 0, 1.0: 0}
+            for _ in range(playouts):
+                outcomes[agent.playout_result(State([row[:] for row in grid]))] += 1
+            counts[engine] = outcomes
+        print(f"{grid}: state {counts['state']}, kernel {counts['kernel']}")
+        for outcome in (0.0, 0.5, 1.0):
+            # Within 5 standard errors of the State engine's frequency
+            p = counts["state"][outcome] / playouts
+            assert abs(counts["kernel"][outcome] / playouts - p) <= 5 * math.sqrt(max(p * (1 - p), 1e-4) / playouts), \
+                f"kernel playouts differ from State playouts on {grid}"
+
+        # Mean playout scores; the State engine adds the evaluation's tie-break noise (at most 0.1)
+        agent = Agent(state=State(grid), tt_size=0)
+        samples = [agent.simulate_random_playout(State(grid)) for _ in range(scored)]
+        mean = sum(samples) / scored
+        error = math.sqrt(sum((x - mean) ** 2 for x in samples) / scored / scored)
+        engines = ["kernel"] + (["batch"] if np is not None else [])
+        for engine in engines:
+            other = Agent(state=State(grid), tt_size=0, playout=engine).playout_scores([State(grid)], scored)[0]
+            print(f"  mean score: state {mean:.2f}, {engine} {other:.2f}")
+            assert abs(other - mean) <= 0.1 + 5 * math.sqrt(2) * max(error, 0.01), \
+                f"{engine} playout scores differ from State playouts on {grid}"
+    print("Kernel playouts match the State engine")
+
 def tester():
     """
     Demonstrates the Agent's behavior.
@@ -423,6 +2193,26 @@ def tester():
 
     print(f"\nTotal moves made until a new region was created: {move_count}")
 
+    # Regression: a settled position (no region can split any more) must still get a move
+    settled = State([[2, 0, 0, 0, 3], [1, 0, 0, 0, 1], [0, 0, 0, 0, 0], [0, 3, 0, 0, 0]])
+    for mode in ("mcts", "parallel_mcts", "leaf_parallel_mcts"):
+        agent = Agent(state=settled, workers=1)
+        agent.mcts_iterations = 50
+        reply = agent.move(State([row[:] for row in settled.grid]), mode)
+        assert sum(map(sum, settled.grid)) - sum(map(sum, reply.grid)) == 1, mode
+    print("Settled positions are answered by every MCTS mode")
+
+    # Regression: every move here hands the opponent a hinger, so selective search must score it as lost
+    trap = State([[0, 0, 0, 0, 0], [0, 1, 0, 0, 0], [1, 0, 1, 0, 0], [0, 1, 0, 0, 0]])
+    agent = Agent(state=trap, selective=True)
+    for mode in ("alpha_beta", "hybrid"):
+        search = agent.hybrid if mode == "hybrid" else agent.alphabeta
+        value = search(trap, 2, float('-inf'), float('inf'), True, parent_state=trap)
+        assert value < 0, f"{mode} scores a position that hands the opponent a hinger at {value}"
+    print("Selective search scores handing the opponent a hinger as a loss")
+
+    test_playout_kernel()
+
 if __name__ == "__main__":
     #test_all_strategies()
     tester()
\ No newline at end of file
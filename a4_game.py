@@ -14,7 +14,8 @@ import pygame
 import sys
 
 from a1_state import State
-from a3_agent import Agent
+from a3_agent import Agent, Telemetry
+from a5_endgame import parity_result
 
 
 # Constants for GUI
@@ -30,13 +31,17 @@ TEXT_COLOR = (220, 220, 220)
 move_history = []
 MAX_LOGS = 6
 
-def play(state, agentA, agentB):
+# Frames per second the game loop is capped at
+FPS = 30
+
+def play(state, agentA, agentB, telemetry=None):
     """
     Simulates the entire Hinger game session between 2 players (AI or humans)
     Parameters:
         state (State): The starting game state (grid of counters).
         agentA : Player A (None = human).
         agentB : Player B (None = human).
+        telemetry (Telemetry): Records the search statistics of every AI move (optional).
     Returns:
         The name of the winner, or None if draw
     """
@@ -59,20 +64,33 @@ def play(state, agentA, agentB):
 
     print("Starting Hinger game!")
 
+    # Search results cached by an agent are only valid within one game
+    for agent in (agentA, agentB):
+        if agent is not None:
+            agent.new_game()
+            if telemetry is not None:
+                agent.telemetry = telemetry
+
+    # AI moves are searched in the background while the loop keeps handling events
+    pending_move = None
+    # Earliest time (in pygame ticks) an agent may start its move, to pace agent-vs-agent games
+    next_move_at = 0
+    redraw = True
+
     while running:
         try:
-            
-            screen.fill(background)
-            draw_board(screen, state, font)
-            draw_text(screen, f"Turn: {turn+1}", 20, height - 60, font)
-            draw_text(screen, f"Turn {turn + 1}: {current_agent.name if current_agent else 'Human'}'s turn", 10, 40, font)
-            pygame.display.set_caption(f"Hinger Game - Turn {turn+1}")
-            display_move_history(screen, font, move_history, start_x=509, start_y=150)
-
-            pygame.display.flip()
-            
-            #define move before event loop
-            move = None
+            # Only draw when something changed; an idle window costs (almost) nothing
+            events = pygame.event.get()
+            if events or redraw:
+                screen.fill(background)
+                draw_board(screen, state, font)
+                draw_text(screen, f"Turn: {turn+1}", 20, height - 60, font)
+                draw_text(screen, f"Turn {turn + 1}: {current_agent.name if current_agent else 'Human'}'s turn", 10, 40, font)
+                pygame.display.set_caption(f"Hinger Game - Turn {turn+1}")
+                display_move_history(screen, font, move_history, start_x=509, start_y=150)
+
+                pygame.display.flip()
+                redraw = False
 
             # check if any counters are left
             active_cells = [(i, j) for i in range(len(state.grid))
@@ -83,11 +101,21 @@ def play(state, agentA, agentB):
                 print("No counters left - draw")
                 break
 
-            # Ask current player for move
-            move = None
+            # Every region fits in a 2x2 box, so no move can ever create a new one
+            settled = parity_result(state)
+            if settled is not None:
+                winner = None
+                print(f"No hinger can appear in the remaining {settled[1]} move(s) - draw")
+                break
+
             # Handle human player (if current_agent is None)      
-            for event in pygame.event.get():
+            for event in events:
                     if event.type == pygame.QUIT:
+                        # Abort the background searches, or exiting waits for them to finish
+                        for agent in (agentA, agentB):
+                            if agent is not None:
+                                agent.stop_pondering()
+                                agent.cancel_moves()
                         pygame.quit()
                         sys.exit()
                     
@@ -111,6 +139,7 @@ def play(state, agentA, agentB):
                                 before_regions = state.numRegions()
                                 state.grid[i][j] -= 1
                                 after_regions = state.numRegions()
+                                redraw = True
 
                                 if after_regions > before_regions:
                                     print("Human found the hinger and wins!")
@@ -118,18 +147,21 @@ def play(state, agentA, agentB):
                                     running = False
                                 else:
                                     move_history.append(f"Turn {turn+1}: Human moved at ({i}, {j})")
-                                    pygame.time.wait(1000)
                                     if len(move_history) > MAX_LOGS:
                                         move_history.pop(0)
                                     current_agent, other_agent = other_agent, current_agent
                                     turn += 1
                         break
 
-            # Handle AI player
-            if current_agent is not None:
-                    pygame.time.delay(500)
+            # Handle AI player: start its search, then check once per frame whether it has answered
+            if running and current_agent is not None:
+                if pending_move is None:
+                    if pygame.time.get_ticks() >= next_move_at:
+                        pending_move = current_agent.move_async(state, current_agent.mode)
+                elif pending_move.done():
+                    new_state = pending_move.result()
+                    pending_move = None
                     prev_grid = [row[:] for row in state.grid]  # Copy grid before move
-                    new_state = current_agent.move(state, mode=current_agent.mode)
 
                     if not isinstance(new_state, State):
                         print("AI returned invalid state; skipping turn.")
@@ -147,6 +179,7 @@ def play(state, agentA, agentB):
 
                     before_regions = state.numRegions()
                     after_regions = new_state.numRegions()
+                    redraw = True
 
                     if after_regions > before_regions:
                         print(f"{current_agent.name} found the hinger and wins...")
@@ -163,19 +196,27 @@ def play(state, agentA, agentB):
                         if len(move_history) > MAX_LOGS:
                             move_history.pop(0)
 
-                        
-                        pygame.time.wait(500)
+                        # Keep searching the likely replies while the opponent thinks
+                        current_agent.ponder(state, current_agent.mode)
 
                         current_agent, other_agent = other_agent, current_agent
                         turn += 1
-                        clock.tick(30)
 
-                        
+                        # Give the board a moment on screen before another agent replies
+                        if current_agent is not None:
+                            next_move_at = pygame.time.get_ticks() + 1000
+
+            # Cap the frame rate; the loop sleeps here instead of spinning
+            clock.tick(FPS)
 
         except Exception as e:
             print(f"Error occurred: {e}")
             pygame.time.wait(2000)
         # End of game display
+    for agent in (agentA, agentB):
+        if agent is not None:
+            agent.stop_pondering()
+            agent.cancel_moves()
     end_screen(screen, winner, font)
     pygame.quit()
     sys.exit()
@@ -209,7 +250,7 @@ def select_mode(agent):
     """
     Allows user to select the AI mode for the agent.
     """
-    modes = ["minimax", "alpha_beta", "monte_carlo", "hybrid"]
+    modes = ["minimax", "alpha_beta", "monte_carlo", "hybrid", "mcts", "parallel_mcts", "lazy_smp"]
     print("Select AI mode:")
     for i, mode in enumerate(modes):
         print(f"{i + 1}. {mode}")
@@ -226,7 +267,7 @@ def select_mode_pygame(screen, font, agent):
     """
     Displays a simple mode selection screen using Pygame.
     """
-    modes = ["minimax", "alpha_beta", "monte_carlo", "hybrid"]
+    modes = ["minimax", "alpha_beta", "monte_carlo", "hybrid", "mcts", "parallel_mcts", "lazy_smp"]
     selected_mode = None
     running = True
     clock = pygame.time.Clock()
@@ -295,9 +336,10 @@ def end_screen(screen, winner, font):
 
 
 
-def main():
+def main(telemetry_path=None):
     """
     Run Hinger Game
+    :param telemetry_path: JSONL file to stream the agents' search statistics to (None records nothing).
     """
 
     grid = [
@@ -324,7 +366,7 @@ def main():
 
     # You can set either agent to None for human play
     agentA = None
-    agentB = Agent(state=state, modes=["minimax", "alpha_beta", "monte_carlo", "hybrid"], name="Agent B")
+    agentB = Agent(state=state, modes=["minimax", "alpha_beta", "monte_carlo", "hybrid", "mcts", "parallel_mcts", "lazy_smp"], name="Agent B")
 
     select_mode_pygame(screen, font, agentB)
     #select_mode(agentB) commented out to avoid console input during pygame run. But can be used for non-pygame testing.
@@ -332,8 +374,9 @@ def main():
     pygame.event.clear()
     pygame.time.wait(300)
 
-    # Start the game session
-    play(state, agentA, agentB)
+    # Start the game session, streaming the agent's search statistics if asked to
+    telemetry = Telemetry(telemetry_path) if telemetry_path else None
+    play(state, agentA, agentB, telemetry=telemetry)
     
 
 
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hinger Project
+Coursework 001 for: CMP-6058A Artificial Intelligence
+
+Includes exact solvers for the Agent class: an endgame tablebase,
+proof-number search and a parity analyzer
+
+@author: B7 (100385659, 100400087, and 100464021)
+@date:   29/09/2025
+"""
+
+from a1_state import State
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import random
+import struct
+import time
+
+# Every move removes one counter, so a position with t counters only leads to
+# positions with t - 1. Solving the boards layer by layer from the empty board
+# upwards (retrograde analysis) gives the exact result of every small endgame.
+# Each position takes one byte, stored at its index among all boards with at
+# most max_total counters.
+
+DEFAULT_TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.tb")
+
+# Results for the player to move; 0 marks an entry that has not been solved
+WIN, LOSS, DRAW = 1, 2, 3
+
+_MAGIC = b"HNGTB1"
+# Magic, rows, columns and the largest counter total in the table
+_HEADER = struct.Struct("<6sBBB")
+
+def _binomials(size):
+    # Pascal's triangle, binom[a][b] = a choose b
+    binom = [[0] * (size + 1) for _ in range(size + 1)]
+    for a in range(size + 1):
+        binom[a][0] = 1
+        for b in range(1, a + 1):
+            binom[a][b] = binom[a - 1][b - 1] + binom[a - 1][b]
+    return binom
+
+def _neighbours(rows, cols):
+    # 8-connected neighbours of every cell of a flat board
+    return [[(i + di) * cols + j + dj
+             for di in (-1, 0, 1) for dj in (-1, 0, 1)
+             if (di or dj) and 0 <= i + di < rows and 0 <= j + dj < cols]
+            for i in range(rows) for j in range(cols)]
+
+def _regions(counts, neighbours):
+    # Number of 8-connected regions of active cells on a flat board
+    seen = [False] * len(counts)
+    regions = 0
+    for cell, count in enumerate(counts):
+        if not count or seen[cell]:
+            continue
+        regions += 1
+        seen[cell] = True
+        stack = [cell]
+        while stack:
+            for other in neighbours[stack.pop()]:
+                if counts[other] and not seen[other]:
+                    seen[other] = True
+                    stack.append(other)
+    return regions
+
+class BoardIndex:
+    """
+    Numbers every board of a given size with at most max_total counters.
+    Boards are ordered by their counter total and, within a total, lexicographically.
+    """
+    def __init__(self, rows, cols, max_total):
+        self.rows, self.cols, self.max_total = rows, cols, max_total
+        self.cells = rows * cols
+        self.binom = _binomials(max_total + self.cells)
+
+    def layer_size(self, total):
+        """Number of boards holding exactly total counters."""
+        return self.binom[total + self.cells - 1][self.cells - 1]
+
+    def layer_start(self, total):
+        """Index of the first board holding total counters."""
+        return self.binom[total + self.cells - 1][self.cells]
+
+    def size(self):
+        """Number of boards in the table."""
+        return self.layer_start(self.max_total + 1)
+
+    def rank(self, counts, total):
+        """Index of the flat board counts holding total counters."""
+        binom = self.binom
+        index = self.layer_start(total)
+        remaining = total
+        last = self.cells - 1
+        for cell, count in enumerate(counts):
+            if count:
+                # Skip the boards with a smaller count in this cell and the same cells before it
+                k = last - cell
+                index += binom[remaining + k][k] - binom[remaining - count + k][k]
+                remaining -= count
+        return index
+
+    def unrank(self, total, offset):
+        """Flat board at position offset among the boards holding total counters."""
+        binom = self.binom
+        counts = []
+        remaining = total
+        for cell in range(self.cells - 1):
+            k = self.cells - 1 - cell
+            count = 0
+            while True:
+                block = binom[remaining - count + k - 1][k - 1]
+                if offset < block:
+                    break
+                offset -= block
+                count += 1
+            counts.append(count)
+            remaining -= count
+        counts.append(remaining)
+        return counts
+
+def _solve_range(path, total, start, stop):
+    # Solve the boards start..stop of one layer from the finished layer below
+    table = Tablebase(path)
+    try:
+        index, data, neighbours = table.index, table.data, table.neighbours
+        base = _HEADER.size
+        results = bytearray(stop - start)
+        for offset in range(start, stop):
+            counts = index.unrank(total, offset)
+            regions = _regions(counts, neighbours)
+            best_win = None
+            draw = False
+            longest_loss = 0
+            for cell, count in enumerate(counts):
+                if not count:
+                    continue
+                counts[cell] -= 1
+                # Emptying a cell may split its region: the mover wins on the spot
+                if count == 1 and _regions(counts, neighbours) > regions:
+                    counts[cell] += 1
+                    best_win = 1
+                    break
+                entry = data[base + index.rank(counts, total - 1)]
+                counts[cell] += 1
+
+                result, distance = entry & 3, (entry >> 2) + 1
+                if result == LOSS:
+                    best_win = distance if best_win is None else min(best_win, distance)
+                elif result == DRAW:
+                    draw = True
+                else:
+                    longest_loss = max(longest_loss, distance)
+
+            # Win as fast as possible, otherwise draw, otherwise lose as slowly as possible
+            if best_win is not None:
+                results[offset - start] = WIN | best_win << 2
+            elif draw:
+                results[offset - start] = DRAW | total << 2
+            else:
+                results[offset - start] = LOSS | longest_loss << 2
+        return start, bytes(results)
+    finally:
+        table.close()
+
+def generate(max_total=6, path=DEFAULT_TABLEBASE_PATH, rows=4, cols=5, workers=None, chunk=8192):
+    """
+    Solve every rows x cols board with at most max_total counters and write the table to path.
+    Each layer of boards is split into chunks solved in parallel by worker processes.
+    :param max_total: Largest number of counters on a solved board (at most 63).
+    :param workers: Worker processes (defaults to the CPU count; 1 solves in this process).
+    :param chunk: Boards per task.
+    Returns the path of the table.
+    """
+    if not 0 <= max_total <= 63:
+        raise ValueError("max_total must be between 0 and 63")
+    index = BoardIndex(rows, cols, max_total)
+    workers = workers or os.cpu_count() or 1
+
+    # Write to a temporary file so a half-built table is never picked up
+    building = path + ".tmp"
+    with open(building, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, rows, cols, max_total))
+        f.truncate(_HEADER.size + index.size())
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with open(building, "r+b") as f:
+            data = mmap.mmap(f.fileno(), 0)
+            # The empty board is a draw
+            data[_HEADER.size] = DRAW
+            data.flush()
+            for total in range(1, max_total + 1):
+                start = index.layer_start(total)
+                size = index.layer_size(total)
+                ranges = [(total, begin, min(begin + chunk, size)) for begin in range(0, size, chunk)]
+                if pool is None:
+                    results = (_solve_range(building, *r) for r in ranges)
+                else:
+                    results = pool.map(_solve_range, [building] * len(ranges), *zip(*ranges))
+                for begin, solved in results:
+                    data[_HEADER.size + start + begin:_HEADER.size + start + begin + len(solved)] = solved
+                # Workers read this layer through their own maps of the file
+                data.flush()
+            data.close()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    os.replace(building, path)
+    return path
+
+class Tablebase:
+    """
+    Read-only, memory-mapped view of a generated tablebase.
+    """
+    def __init__(self, path=DEFAULT_TABLEBASE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, cols, max_total = _HEADER.unpack_from(self.data)
+        if magic != _MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not a Hinger tablebase")
+        self.index = BoardIndex(rows, cols, max_total)
+        self.neighbours = _neighbours(rows, cols)
+
+    @property
+    def max_total(self):
+        return self.index.max_total
+
+    def close(self):
+        self.data.close()
+
+    def probe(self, state):
+        """
+        Return (result, distance) for the player to move in state, or None when
+        the table does not cover it. distance counts the moves until the game ends.
+        """
+        grid = state.grid
+        if len(grid) != self.index.rows or len(grid[0]) != self.index.cols:
+            return None
+        counts = [value for row in grid for value in row]
+        total = sum(counts)
+        if total > self.index.max_total:
+            return None
+        entry = self.data[_HEADER.size + self.index.rank(counts, total)]
+        if not entry & 3:
+            return None
+        return entry & 3, entry >> 2
+
+    def best_move(self, state):
+        """
+        Return ((i, j), child, result, distance) for a perfect move from state, or
+        None when the table does not cover it or no move is left.
+        A win is taken by the shortest route, a loss delayed as long as possible.
+        """
+        entry = self.probe(state)
+        if entry is None:
+            return None
+        result, distance = entry
+
+        # Without a winning move no child splits a region, so all of them are in the table
+        regions = state.numRegions()
+        for pos, child in state.movesWithPositions():
+            if result == WIN:
+                if distance == 1:
+                    if child.numRegions() > regions:
+                        return pos, child, result, distance
+                    continue
+                # The opponent must be lost one move sooner
+                if self.probe(child) == (LOSS, distance - 1):
+                    return pos, child, result, distance
+            else:
+                child_result, child_distance = self.probe(child)
+                wanted = DRAW if result == DRAW else WIN
+                if child_result == wanted and child_distance == distance - 1:
+                    return pos, child, result, distance
+        return None
+
+# A region can only ever be split if it has two cells that are not neighbours:
+# removing everything else in between leaves them apart. A region whose cells
+# all touch each other (it fits in a 2x2 box) never splits, and regions never
+# merge, so once every region is like that nobody can win any more. The game
+# is then a draw decided by counter parity alone: the counters are played out
+# and the total says who removes the last one.
+
+def parity_result(state):
+    """
+    Return (DRAW, moves left) when no sequence of moves can split a region any
+    more, otherwise None. An odd number of moves left means the player to move
+    takes the last counter. Runs in time linear in the number of cells.
+    """
+    grid = state.grid
+    rows, cols = len(grid), len(grid[0])
+    seen = [[False] * cols for _ in range(rows)]
+    total = 0
+    for i in range(rows):
+        for j in range(cols):
+            if not grid[i][j] or seen[i][j]:
+                continue
+            # Bounding box of this cell's region
+            top, bottom, left, right = i, i, j, j
+            seen[i][j] = True
+            stack = [(i, j)]
+            while stack:
+                r, c = stack.pop()
+                total += grid[r][c]
+                top, bottom = min(top, r), max(bottom, r)
+                left, right = min(left, c), max(right, c)
+                if bottom - top > 1 or right - left > 1:
+                    return None
+                for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                    for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                        if grid[nr][nc] and not seen[nr][nc]:
+                            seen[nr][nc] = True
+                            stack.append((nr, nc))
+    return DRAW, total
+
+# Proof-number search answers one question exactly: can the player to move force
+# a win? It grows the game tree best-first, always expanding the leaf that most
+# cheaply helps prove or disprove the root. A draw counts as not a win.
+
+INFINITY = float('inf')
+
+class PNNode:
+    """
+    Node of a proof-number search tree. OR nodes have the player we are proving
+    a win for to move, AND nodes their opponent.
+    """
+    __slots__ = ("state", "is_or", "parent", "move", "children", "pn", "dn")
+
+    def __init__(self, state, is_or, parent=None, move=None):
+        self.state = state
+        self.is_or = is_or
+        self.parent = parent
+        self.move = move
+        self.children = None
+        self.pn = 1
+        self.dn = 1
+
+    def key(self):
+        return tuple(tuple(row) for row in self.state.grid), self.is_or
+
+    def set_solved(self, win):
+        # pn = 0 proves the win, dn = 0 disproves it
+        self.pn, self.dn = (0, INFINITY) if win else (INFINITY, 0)
+
+    def evaluate(self, table):
+        """Set the numbers of a new leaf from the rules, the table or its mobility."""
+        solved = table.get(self.key())
+        if solved is not None:
+            self.set_solved(solved)
+            return
+        positions = self.state.getPositions()
+
+        # No counters left, or no region can split any more: a draw, which is not a win
+        if not positions or parity_result(self.state) is not None:
+            self.set_solved(False)
+            return
+
+        # A move that splits a region wins for whoever is to move
+        regions = self.state.numRegions()
+        grid = self.state.grid
+        for (i, j) in positions:
+            if grid[i][j] == 1:
+                grid[i][j] = 0
+                splits = self.state.numRegions() > regions
+                grid[i][j] = 1
+                if splits:
+                    self.set_solved(self.is_or)
+                    return
+
+        # More replies make a node harder to prove for the side that must answer all of them
+        if self.is_or:
+            self.pn, self.dn = 1, len(positions)
+        else:
+            self.pn, self.dn = len(positions), 1
+
+    def update(self):
+        """Recompute the numbers from the children."""
+        if self.is_or:
+            self.pn = min(child.pn for child in self.children)
+            self.dn = sum(child.dn for child in self.children)
+        else:
+            self.pn = sum(child.pn for child in self.children)
+            self.dn = min(child.dn for child in self.children)
+
+def solve(state, max_nodes=100000, time_limit=None, table=None):
+    """
+    Proof-number search: decide whether the player to move in state can force a win.
+    :param max_nodes: Tree nodes to create before giving up.
+    :param time_limit: Seconds to search before giving up (None for no limit).
+    :param table: Dictionary of solved positions, kept between calls to reuse them.
+    Returns (result, cell): result is True for a forced win, False when the player
+    to move cannot win (a loss or a draw) and None when the budget ran out; cell is
+    the first move of a winning line.
+    """
+    table = {} if table is None else table
+    deadline = None if time_limit is None else time.time() + time_limit
+    root = PNNode(state, True)
+    # The table only says whether a position is won, not how, so the root is always
+    # expanded; its children's entries then give the winning move straight away
+    root.evaluate({})
+    nodes = 1
+
+    while root.pn and root.dn:
+        if nodes >= max_nodes or (deadline is not None and time.time() > deadline):
+            return None, None
+
+        # Follow the children that decide the root's numbers down to a leaf
+        node = root
+        while node.children:
+            if node.is_or:
+                node = min(node.children, key=lambda child: child.pn)
+            else:
+                node = min(node.children, key=lambda child: child.dn)
+
+        node.children = [PNNode(child, not node.is_or, node, pos)
+                         for pos, child in node.state.movesWithPositions()]
+        for child in node.children:
+            child.evaluate(table)
+        nodes += len(node.children)
+
+        # Back the new numbers up until they stop changing
+        while node is not None:
+            old = (node.pn, node.dn)
+            node.update()
+            if not node.pn or not node.dn:
+                table[node.key()] = not node.pn
+                # A solved subtree is never visited again; keep the root's children for the move
+                if node is not root:
+                    node.children = []
+            if (node.pn, node.dn) == old:
+                break
+            node = node.parent
+
+    if root.pn == 0:
+        if root.children:
+            win = next(child for child in root.children if child.pn == 0)
+            return True, win.move
+        # Proven without expanding: the root has a move that splits a region
+        regions = state.numRegions()
+        for pos, child in state.movesWithPositions():
+            if child.numRegions() > regions:
+                return True, pos
+    return False, None
+
+def _negamax(state):
+    # Plain recursive solver used to check the table: (result, distance)
+    positions = state.getPositions()
+    if not positions:
+        return DRAW, 0
+    regions = state.numRegions()
+    outcomes = []
+    for child in state.moves():
+        if child.numRegions() > regions:
+            return WIN, 1
+        result, distance = _negamax(child)
+        outcomes.append((result, distance + 1))
+    wins = [d for r, d in outcomes if r == LOSS]
+    if wins:
+        return WIN, min(wins)
+    draws = [d for r, d in outcomes if r == DRAW]
+    if draws:
+        return DRAW, draws[0]
+    return LOSS, max(d for _, d in outcomes)
+
+def tester():
+    """
+    Builds a small tablebase and checks it against a direct search.
+    """
+    path = DEFAULT_TABLEBASE_PATH + ".test"
+    start = time.time()
+    generate(max_total=5, path=path, workers=2)
+    print(f"Generated 4x5 tablebase up to 5 counters in {time.time() - start:.2f}s")
+
+    table = Tablebase(path)
+    names = {WIN: "win", LOSS: "loss", DRAW: "draw"}
+    for _ in range(5):
+        grid = [[0] * 5 for _ in range(4)]
+        for _ in range(random.randint(1, 5)):
+            grid[random.randrange(4)][random.randrange(5)] += 1
+        state = State(grid)
+        result, distance = table.probe(state)
+        expected = _negamax(state)
+        print(state)
+        print(f"Table: {names[result]} in {distance} | Search: {names[expected[0]]} in {expected[1]}")
+        move = table.best_move(state)
+        if move is not None:
+            print(f"Best move: {move[0]}\n")
+    table.close()
+    os.remove(path)
+
+    print("Proof-number search on a random board:")
+    state = State(None)
+    print(state)
+    start = time.time()
+    result, cell = solve(state, max_nodes=50000)
+    outcome = {True: f"forced win starting at {cell}", False: "no forced win", None: "unknown"}[result]
+    print(f"Result: {outcome} ({time.time() - start:.2f}s)")
+
+if __name__ == "__main__":
+    tester()
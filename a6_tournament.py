@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hinger Project
+Coursework 001 for: CMP-6058A Artificial Intelligence
+
+Includes a headless game session and a self-play tournament runner
+
+@author: B7 (100385659, 100400087, and 100464021)
+@date:   29/09/2025
+"""
+
+from a1_state import State
+from a3_agent import Agent, process_pool
+from a5_endgame import parity_result
+import itertools
+import os
+import random
+import time
+
+class GameSession:
+    """
+    A Hinger game without a window: holds the board, checks every move against
+    the rules and records the result. Nothing is drawn, slept or printed, so
+    many sessions can run side by side.
+    """
+    def __init__(self, state, adjudicate=True):
+        """
+        :param state: Starting position; the session plays on its own copy.
+        :param adjudicate: End the game as a draw as soon as no region can split any more.
+        """
+        self.state = State([row[:] for row in state.grid])
+        self.adjudicate = adjudicate
+        self.turn = 0
+        self.moves = []
+        self.winner = None  # index of the winning player, None for a draw
+        self.over = False
+        self.reason = None
+        self.check_end()
+
+    @property
+    def player(self):
+        """Index of the player to move."""
+        return self.turn % 2
+
+    def check_end(self):
+        """End the game as a draw when the board is empty (or settled, when adjudicating)."""
+        if not self.state.getPositions():
+            self.over, self.reason = True, "empty"
+        elif self.adjudicate and parity_result(self.state) is not None:
+            self.over, self.reason = True, "settled"
+        return self.over
+
+    def apply(self, cell):
+        """
+        Remove a counter from cell for the player to move.
+        Raises ValueError for a move the rules do not allow. Returns True once the game is over.
+        """
+        if self.over:
+            raise ValueError("the game is over")
+        i, j = cell
+        grid = self.state.grid
+        if not (0 <= i < len(grid) and 0 <= j < len(grid[0])) or grid[i][j] == 0:
+            raise ValueError(f"illegal move {cell}")
+
+        regions = self.state.numRegions()
+        grid[i][j] -= 1
+        self.moves.append((i, j))
+
+        # Splitting a region wins the game
+        if self.state.numRegions() > regions:
+            self.winner, self.over, self.reason = self.player, True, "hinger"
+            return True
+        self.turn += 1
+        return self.check_end()
+
+    def apply_state(self, new_state):
+        """
+        Play the move that turns the current board into new_state.
+        Raises ValueError unless exactly one counter was removed.
+        """
+        grid = self.state.grid
+        changed = [(i, j) for i in range(len(grid)) for j in range(len(grid[0]))
+                   if new_state.grid[i][j] != grid[i][j]]
+        if len(changed) != 1 or new_state.grid[changed[0][0]][changed[0][1]] != grid[changed[0][0]][changed[0][1]] - 1:
+            raise ValueError("a move must remove exactly one counter")
+        return self.apply(changed[0])
+
+    def play(self, players, max_turns=None):
+        """
+        Play the game out. players are two callables taking the State to move from
+        and returning the State after their move; a player whose move breaks the
+        rules loses. Returns the index of the winner, or None for a draw.
+        """
+        while not self.over:
+            if max_turns is not None and self.turn >= max_turns:
+                self.over, self.reason = True, "turn limit"
+                break
+            player = self.player
+            new_state = players[player](State([row[:] for row in self.state.grid]))
+            try:
+                self.apply_state(new_state)
+            except ValueError:
+                self.winner, self.over, self.reason = 1 - player, True, "illegal move"
+        return self.winner
+
+class Entrant:
+    """
+    A tournament player: an agent configuration and how it is asked to move.
+    """
+    def __init__(self, name, mode, move_options=None, agent_options=None, settings=None):
+        """
+        :param name: Name used in the results; must be unique within a tournament.
+        :param mode: Mode passed to Agent.move.
+        :param move_options: Other keyword arguments for Agent.move, e.g. search_depth.
+        :param agent_options: Keyword arguments for the Agent constructor.
+        :param settings: Agent attributes set after construction, e.g. mcts_iterations.
+        """
+        self.name = name
+        self.mode = mode
+        self.move_options = move_options or {}
+        self.agent_options = agent_options or {}
+        self.settings = settings or {}
+
+    def make_agent(self):
+        """Build a fresh agent for one game."""
+        agent = Agent(name=self.name, **self.agent_options)
+        for name, value in self.settings.items():
+            setattr(agent, name, value)
+        return agent
+
+def random_grid(rng, rows=4, cols=5):
+    """A random starting board drawn like State(None), from the given Random."""
+    grid = [[0] * cols for _ in range(rows)]
+    for pos in rng.sample(range(rows * cols), rng.randint(8, 15)):
+        grid[pos // cols][pos % cols] = rng.randint(1, 9)
+    return grid
+
+def _tournament_game(first, second, grid, adjudicate):
+    # Play one game between fresh agents; returns (winner index, turns, reason)
+    players = []
+    for entrant in (first, second):
+        agent = entrant.make_agent()
+        players.append(lambda state, agent=agent, entrant=entrant:
+                       agent.move(state, entrant.mode, **entrant.move_options))
+    session = GameSession(State(grid), adjudicate=adjudicate)
+    winner = session.play(players)
+    return winner, session.turn, session.reason
+
+def elo_ratings(results, names, k=16, initial=1500):
+    """
+    Elo ratings after the given games, applied in order.
+    results are (first name, second name, score of the first player) with 1, 0.5 or 0.
+    """
+    ratings = {name: float(initial) for name in names}
+    for first, second, score in results:
+        expected = 1 / (1 + 10 ** ((ratings[second] - ratings[first]) / 400))
+        ratings[first] += k * (score - expected)
+        ratings[second] -= k * (score - expected)
+    return ratings
+
+def tournament(entrants, games=10, workers=None, seed=None, adjudicate=True):
+    """
+    Round robin between entrants, played headless across the process pool.
+    Every board is played twice with the players swapped, so each pairing plays
+    games games (rounded up to an even number).
+    Returns a report with games per second, results per pairing and Elo ratings.
+    """
+    rng = random.Random(seed)
+    jobs = []
+    for a, b in itertools.combinations(range(len(entrants)), 2):
+        for _ in range((games + 1) // 2):
+            grid = random_grid(rng)
+            jobs.append((a, b, grid))
+            jobs.append((b, a, grid))
+
+    workers = workers or os.cpu_count() or 1
+    pool = process_pool(workers)
+    start = time.time()
+    outcomes = pool.map(_tournament_game,
+                        [entrants[first] for first, _, _ in jobs],
+                        [entrants[second] for _, second, _ in jobs],
+                        [grid for _, _, grid in jobs],
+                        [adjudicate] * len(jobs),
+                        chunksize=max(1, len(jobs) // (workers * 4)))
+
+    pairings = {}
+    results = []
+    turns = 0
+    for (first, second, _), (winner, game_turns, _) in zip(jobs, outcomes):
+        turns += game_turns
+        a, b = min(first, second), max(first, second)
+        key = (entrants[a].name, entrants[b].name)
+        stats = pairings.setdefault(key, {"games": 0, "wins": [0, 0], "draws": 0})
+        stats["games"] += 1
+        if winner is None:
+            stats["draws"] += 1
+            score = 0.5
+        else:
+            winning = (first, second)[winner]
+            stats["wins"][0 if winning == a else 1] += 1
+            score = 1.0 if winner == 0 else 0.0
+        results.append((entrants[first].name, entrants[second].name, score))
+    elapsed = time.time() - start
+
+    for stats in pairings.values():
+        stats["win_rates"] = [wins / stats["games"] for wins in stats["wins"]]
+    return {
+        "games": len(jobs),
+        "elapsed": elapsed,
+        "games_per_second": len(jobs) / elapsed if elapsed > 0 else None,
+        "mean_turns": turns / len(jobs) if jobs else 0,
+        "pairings": pairings,
+        "elo": elo_ratings(results, [entrant.name for entrant in entrants]),
+    }
+
+def print_report(report):
+    """Print a tournament report as a small table."""
+    print(f"{report['games']} games in {report['elapsed']:.2f}s "
+          f"({report['games_per_second']:.1f} games/s, {report['mean_turns']:.1f} turns per game)")
+    for (a, b), stats in report["pairings"].items():
+        print(f"  {a} vs {b}: {stats['wins'][0]}-{stats['wins'][1]} with {stats['draws']} draws "
+              f"(win rates {stats['win_rates'][0]:.2f} / {stats['win_rates'][1]:.2f})")
+    print("Elo:")
+    for name, rating in sorted(report["elo"].items(), key=lambda item: -item[1]):
+        print(f"  {name}: {rating:.0f}")
+
+def tester():
+    """
+    Runs a small self-play tournament between a few cheap agents.
+    """
+    entrants = [
+        Entrant("alpha_beta-1", "alpha_beta", {"search_depth": 1}, {"move_ordering": "history"}),
+        Entrant("selective-2", "alpha_beta", {"search_depth": 2},
+                {"move_ordering": "history", "collapse_moves": True, "selective": True}),
+        Entrant("mcts-200", "mcts", settings={"mcts_iterations": 200}, agent_options={"playout": "kernel"}),
+    ]
+    report = tournament(entrants, games=6, seed=1)
+    print_report(report)
+
+if __name__ == "__main__":
+    tester()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hinger Project
+Coursework 001 for: CMP-6058A Artificial Intelligence
+
+Includes a local HTTP/JSON move server for the Agent
+
+@author: B7 (100385659, 100400087, and 100464021)
+@date:   29/09/2025
+"""
+
+from a1_state import State
+from a3_agent import Agent, canonical_board, mirror_board
+from collections import OrderedDict
+import asyncio
+import json
+import time
+
+# Modes the server answers; the parallel ones already use the process pool themselves
+MODES = ("minimax", "alpha_beta", "monte_carlo", "hybrid", "pvs", "aspiration", "mtdf", "pns", "mcts")
+# Keyword arguments of Agent.move a request may set
+MOVE_OPTIONS = ("search_depth", "time_limit", "max_depth")
+# Deepest search_depth/max_depth a request may ask for
+MAX_SEARCH_DEPTH = 8
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+class RequestError(Exception):
+    """A request the server answers with an HTTP error status."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class MoveServer:
+    """
+    Serves Agent moves over HTTP/JSON on localhost.
+
+    POST /move with {"grid": [[...]], "mode": "alpha_beta", "options": {"search_depth": 3},
+    "deadline": 2.0} answers {"grid": [[...]], "move": [i, j], "cached": false}.
+    GET /stats reports the counters below.
+
+    Searches run in the shared process pool, so the event loop only parses and
+    routes requests. Mirrored boards are searched once: requests for a position
+    already being searched wait for that search, and recent answers are kept in
+    a bounded LRU. Once max_pending searches are running, new ones are turned
+    away with 503, and a request that outlives its deadline gets 504 (its search
+    still finishes and is cached for a retry).
+    """
+    def __init__(self, host="127.0.0.1", port=8765, workers=None, cache_size=4096, max_pending=64,
+                 deadline=30.0, max_body=1 << 16, agent=None):
+        """
+        :param port: Port to listen on (0 picks a free one, see self.port after start()).
+        :param workers: Processes searching moves (defaults to the CPU count).
+        :param cache_size: Answers kept in the LRU.
+        :param max_pending: Searches allowed to run or queue at once.
+        :param deadline: Seconds a request may wait when it does not give its own deadline.
+        :param max_body: Largest request body accepted, in bytes.
+        :param agent: Agent whose settings the searches use (defaults to a new one).
+        """
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.max_body = max_body
+        self.agent = agent if agent is not None else Agent(workers=workers)
+        if workers is not None:
+            self.agent.workers = workers
+
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.server = None
+        self.stats = {"requests": 0, "searches": 0, "cache_hits": 0, "coalesced": 0,
+                      "rejected": 0, "timeouts": 0, "errors": 0}
+
+    async def start(self):
+        """Start listening."""
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start listening (if needed) and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening, then wait for the open connections and running searches to finish."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await asyncio.gather(*self.pending.values(), return_exceptions=True)
+
+    async def answer(self, grid, mode, options, deadline):
+        """
+        Return (grid after the move, cached) for a validated request, searching
+        the position only if no answer or running search can be reused.
+        """
+        board, symmetry = canonical_board(grid)
+        key = (board, mode, tuple(sorted(options.items())))
+
+        cached = key in self.cache
+        if cached:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            result = self.cache[key]
+        else:
+            search = self.pending.get(key)
+            if search is not None:
+                self.stats["coalesced"] += 1
+            else:
+                if len(self.pending) >= self.max_pending:
+                    self.stats["rejected"] += 1
+                    raise RequestError(503, "too many searches pending, retry later")
+                search = self.pending[key] = asyncio.ensure_future(self.search(key))
+            try:
+                # Shielded, so a request giving up does not cancel a search others wait for
+                result = await asyncio.wait_for(asyncio.shield(search), deadline)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise RequestError(504, f"no move within {deadline}s")
+        return [list(row) for row in mirror_board(result, *symmetry)], cached
+
+    async def search(self, key):
+        # Search a canonical board in the process pool and cache the answer
+        board, mode, options = key
+        self.stats["searches"] += 1
+        try:
+            future = self.agent.move_async(State([list(row) for row in board]), mode, processes=True,
+                                           **dict(options))
+            result = tuple(tuple(row) for row in (await asyncio.wrap_future(future)).grid)
+        finally:
+            del self.pending[key]
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def parse_move(self, body):
+        """Validate a /move request body; returns (grid, mode, options, deadline)."""
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise RequestError(400, "body is not valid JSON")
+        if not isinstance(request, dict):
+            raise RequestError(400, "body must be a JSON object")
+
+        grid = request.get("grid")
+        if (not isinstance(grid, list) or not grid or not all(isinstance(row, list) for row in grid)
+                or not grid[0] or any(len(row) != len(grid[0]) for row in grid)
+                or not all(isinstance(cell, int) and not isinstance(cell, bool) and 0 <= cell <= 255
+                           for row in grid for cell in row)):
+            raise RequestError(400, "grid must be a rectangular list of rows of counts")
+
+        mode = request.get("mode", "alpha_beta")
+        if mode not in MODES:
+            raise RequestError(400, f"mode must be one of {', '.join(MODES)}")
+
+        options = request.get("options", {})
+        if not isinstance(options, dict) or any(name not in MOVE_OPTIONS for name in options):
+            raise RequestError(400, f"options may only set {', '.join(MOVE_OPTIONS)}")
+        for name, value in options.items():
+            if isinstance(value, bool):
+                raise RequestError(400, f"{name} must be a number")
+            if name == "time_limit":
+                if not isinstance(value, (int, float)) or value < 0:
+                    raise RequestError(400, "time_limit must be a non-negative number of seconds")
+            # A fractional depth never reaches 0 and would search the whole game tree
+            elif not isinstance(value, int) or not 0 <= value <= MAX_SEARCH_DEPTH:
+                raise RequestError(400, f"{name} must be a whole number from 0 to {MAX_SEARCH_DEPTH}")
+
+        deadline = request.get("deadline", self.deadline)
+        if not isinstance(deadline, (int, float)) or isinstance(deadline, bool) or deadline <= 0:
+            raise RequestError(400, "deadline must be a positive number of seconds")
+        return grid, mode, options, deadline
+
+    async def route(self, method, path, body):
+        """Return (status, response object) for one request."""
+        if path == "/stats":
+            if method != "GET":
+                raise RequestError(405, "use GET")
+            return 200, dict(self.stats, pending=len(self.pending), cached=len(self.cache))
+        if path != "/move":
+            raise RequestError(404, f"no such path {path}")
+        if method != "POST":
+            raise RequestError(405, "use POST")
+
+        start = time.time()
+        grid, mode, options, deadline = self.parse_move(body)
+        result, cached = await self.answer(grid, mode, options, deadline)
+        changed = [[i, j] for i in range(len(grid)) for j in range(len(grid[0])) if grid[i][j] != result[i][j]]
+        return 200, {"grid": result, "move": changed[0] if changed else None, "cached": cached,
+                     "elapsed": time.time() - start}
+
+    async def handle(self, reader, writer):
+        # One connection: HTTP/1.1 requests until the client closes it
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.stats["requests"] += 1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    parts = request_line.decode("latin-1").split()
+                    if len(parts) != 3:
+                        raise RequestError(400, "malformed request line")
+                    method, path, _ = parts
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length > self.max_body:
+                        keep_alive = False
+                        raise RequestError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, response = await self.route(method, path, body)
+                except RequestError as error:
+                    status, response = error.status, {"error": str(error)}
+                except (ValueError, asyncio.IncompleteReadError):
+                    status, response, keep_alive = 400, {"error": "malformed request"}, False
+                except Exception as error:
+                    self.stats["errors"] += 1
+                    status, response = 500, {"error": str(error)}
+
+                payload = json.dumps(response).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def request_move(host, port, grid, mode="alpha_beta", options=None, deadline=None):
+    """
+    Ask a MoveServer for a move over one connection.
+    Returns (status, response object).
+    """
+    request = {"grid": grid, "mode": mode, "options": options or {}}
+    if deadline is not None:
+        request["deadline"] = deadline
+    return await http_request(host, port, "POST", "/move", json.dumps(request).encode())
+
+async def http_request(host, port, method, path, body=b""):
+    """Send one HTTP request and return (status, decoded JSON response)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await reader.readexactly(length))
+    finally:
+        writer.close()
+
+async def _demo():
+    # Serve on a free localhost port and exercise the cache, coalescing and errors
+    server = MoveServer(port=0, workers=2)
+    await server.start()
+    print(f"Serving on http://{server.host}:{server.port}")
+    try:
+        grid = State(None).grid
+        mirrored = [row[::-1] for row in grid]
+        options = {"search_depth": 3}
+
+        # Identical and mirrored requests at once share a single search
+        start = time.time()
+        replies = await asyncio.gather(*(request_move(server.host, server.port, board, options=options)
+                                         for board in (grid, grid, mirrored, mirrored)))
+        print(f"4 concurrent requests in {time.time() - start:.3f}s:",
+              [(status, reply["move"]) for status, reply in replies])
+
+        start = time.time()
+        status, reply = await request_move(server.host, server.port, grid, options=options)
+        print(f"Repeated request in {time.time() - start:.4f}s: {status}, cached={reply['cached']}")
+
+        status, reply = await request_move(server.host, server.port, [[1, 2], [3]])
+        print(f"Bad board: {status} {reply['error']}")
+        status, reply = await request_move(server.host, server.port, State(None).grid,
+                                           options={"search_depth": 5}, deadline=0.01)
+        print(f"Tight deadline: {status} {reply['error']}")
+
+        status, stats = await http_request(server.host, server.port, "GET", "/stats")
+        print("Stats:", stats)
+    finally:
+        await server.close()
+
+def tester():
+    """
+    Starts a server on localhost and sends it a few requests.
+    """
+    asyncio.run(_demo())
+
+if __name__ == "__main__":
+    tester()